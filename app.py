@@ -1,20 +1,30 @@
 from venv import logger
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_file
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, send_file, Response
 from authlib.integrations.flask_client import OAuth
 from flask_admin import Admin, BaseView, expose
 from flask_admin.contrib.sqla import ModelView
 from flask import redirect, url_for, session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from sqlalchemy import event
+from datetime import datetime
 from models import db, User, Download
 
 import os
-from models import db, User, Download
-from utils.downloader import VideoDownloader
+import sys
+import json
+import shlex
+from urllib.parse import quote
+from werkzeug.utils import send_file as send_file_headers
+from itsdangerous import URLSafeSerializer, BadSignature
+from models import db, User, Download, DownloadStatsRollup, UserDownloadSummary
+from utils.downloader import VideoDownloader, metadata_cache, artifact_cache, method_stats, bandwidth, storage_index, storage_evictor, transcoder
 from utils.video_processor import VideoProcessor
+from utils.job_queue import DownloadJobQueue
+from utils.file_reaper import FileReaper
+from utils.zip_stream import ZipStream
+from utils.thumbnail_cache import ThumbnailCache, THUMBNAIL_SIZES
+from utils.metrics import registry as metrics_registry, STAGE_SECONDS
 from config import Config
 from flask_migrate import Migrate
-from sqlalchemy import func
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -23,6 +33,119 @@ app.config.from_object(Config)
 db.init_app(app)
 migrate = Migrate(app, db)
 
+def configured_web_workers():
+    """Worker processes the server was started with, from WEB_CONCURRENCY or gunicorn's --workers"""
+    workers = app.config['WEB_CONCURRENCY']
+    args = shlex.split(os.environ.get('GUNICORN_CMD_ARGS', ''))
+    if os.path.basename(sys.argv[0]).startswith('gunicorn'):
+        args += sys.argv[1:]
+    for index, arg in enumerate(args):
+        if arg in ('-w', '--workers') and index + 1 < len(args):
+            workers = int(args[index + 1])
+        elif arg.startswith('--workers='):
+            workers = int(arg.split('=', 1)[1])
+        elif arg.startswith('-w') and arg[2:].isdigit():
+            workers = int(arg[2:])
+    return workers
+
+# Jobs live in this process, so a second worker would 404 on jobs it never saw
+if configured_web_workers() > 1:
+    raise RuntimeError(
+        'VidSparrow keeps download jobs in memory and must run as a single worker process; '
+        'use threads instead, e.g. gunicorn --workers 1 --threads 16 app:app'
+    )
+
+# Background download workers
+job_queue = DownloadJobQueue(
+    max_workers=app.config['DOWNLOAD_WORKERS'],
+    retention_seconds=app.config['JOB_RETENTION_SECONDS']
+)
+
+metadata_cache.configure(
+    max_size=app.config['METADATA_CACHE_SIZE'],
+    ttl=app.config['METADATA_CACHE_TTL']
+)
+artifact_cache.load(app.config['ARTIFACT_INDEX_PATH'])
+storage_index.load(app.config['STORAGE_INDEX_PATH'])
+storage_index.start(interval=app.config['STORAGE_RECONCILE_INTERVAL'])
+storage_evictor.configure(
+    max_bytes=app.config['STORAGE_MAX_BYTES'],
+    min_free_bytes=app.config['STORAGE_MIN_FREE_BYTES'],
+    idle_seconds=app.config['STORAGE_EVICT_IDLE_SECONDS'],
+    before_remove=artifact_cache.invalidate_file
+)
+storage_evictor.start(interval=app.config['STORAGE_EVICT_INTERVAL'])
+transcoder.configure(
+    max_workers=app.config['TRANSCODE_WORKERS'],
+    ffmpeg_path=app.config['FFMPEG_PATH'],
+    mp3_ladder=app.config['MP3_LADDER']
+)
+bandwidth.configure(
+    total_rate=app.config['BANDWIDTH_LIMIT'],
+    concurrent_fragments=app.config['CONCURRENT_FRAGMENTS']
+)
+app.config['USE_X_SENDFILE'] = app.config['FILE_OFFLOAD'] == 'x-sendfile'
+
+# Files of deleted downloads are removed in the background once nothing refers to them
+def file_is_referenced(filename):
+    with app.app_context():
+        return db.session.query(Download.id).filter_by(filename=filename).first() is not None
+
+file_reaper = FileReaper(storage_index)
+file_reaper.configure(
+    file_is_referenced,
+    before_remove=artifact_cache.invalidate_file
+)
+
+# Remote thumbnails are fetched once and served from disk; pages only ever see signed local URLs
+thumbnail_cache = ThumbnailCache()
+thumbnail_cache.configure(
+    cache_dir=app.config['THUMBNAIL_CACHE_DIR'],
+    max_bytes=app.config['THUMBNAIL_CACHE_MAX_BYTES'],
+    max_age=app.config['THUMBNAIL_MAX_AGE']
+)
+thumbnail_signer = URLSafeSerializer(app.config['SECRET_KEY'], salt='thumbnail')
+
+def thumbnail_proxy_url(url, size='sm'):
+    """Local /thumb URL for a remote thumbnail, '' if there is none"""
+    if not url:
+        return ''
+    return url_for('thumbnail', token=thumbnail_signer.dumps(url), size=size)
+
+app.jinja_env.globals['thumbnail_proxy_url'] = thumbnail_proxy_url
+
+# Gauges read at scrape time from the components that already track them
+metrics_registry.gauge(
+    'vidsparrow_jobs', 'Download jobs by state', ['state'],
+    callback=lambda: {(state,): count for state, count in job_queue.stats().items() if state in ('queued', 'running')}
+)
+metrics_registry.gauge(
+    'vidsparrow_downloads_in_flight', 'Downloads currently running',
+    callback=lambda: job_queue.running('download')
+)
+metrics_registry.gauge(
+    'vidsparrow_transcodes', 'MP3 encodes by state', ['state'],
+    callback=lambda: {(state,): transcoder.stats()[state] for state in ('queued', 'running')}
+)
+metrics_registry.gauge(
+    'vidsparrow_downloads_dir_bytes', 'Bytes stored in downloads/',
+    callback=lambda: storage_index.stats()['total_size_bytes']
+)
+metrics_registry.gauge(
+    'vidsparrow_downloads_dir_files', 'Files stored in downloads/',
+    callback=lambda: storage_index.stats()['total_files']
+)
+
+@event.listens_for(db.session, 'after_commit')
+def reap_released_files(db_session):
+    released = db_session.info.pop('released_files', None)
+    if released:
+        file_reaper.enqueue(released)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def keep_released_files(db_session, previous_transaction):
+    db_session.info.pop('released_files', None)
+
 # Custom formatters
 def file_size_formatter(view, value):
     if value:
@@ -59,8 +182,7 @@ class UserAdminView(ModelView):
     column_searchable_list = ['email', 'name']
     column_filters = ['created_at']
     column_formatters = {
-        'created_at': datetime_formatter,
-        'download_count': lambda v, c, m, n: len(m.downloads)
+        'created_at': datetime_formatter
     }
     page_size = 20
     
@@ -104,8 +226,7 @@ class DownloadAdminView(ModelView):
 from flask_admin import Admin, BaseView, expose
 from flask_admin.contrib.sqla import ModelView
 from flask import redirect, url_for, session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from datetime import datetime
 from models import db, User, Download
 
 # Custom Admin Views without the cls parameter issue
@@ -118,6 +239,8 @@ class SecureModelView(ModelView):
 
 class UserAdminView(SecureModelView):
     column_list = ['id', 'name', 'email', 'created_at', 'download_count']
+    # download_count is a column property, so sorting by it stays in SQL
+    column_sortable_list = ['id', 'name', 'email', 'created_at', 'download_count']
     column_searchable_list = ['email', 'name']
     column_filters = ['created_at']
     page_size = 20
@@ -154,26 +277,26 @@ class StatsView(BaseView):
         try:
             # Get total statistics
             total_users = User.query.count()
-            total_downloads = Download.query.count()
             
-            # Get downloads by format
-            format_stats = db.session.query(
-                Download.format_type,
-                func.count(Download.id).label('count'),
-                func.sum(Download.file_size).label('total_size')
-            ).group_by(Download.format_type).all()
+            # Download figures come from the rollup, which stays small however many downloads there are
+            summary = DownloadStatsRollup.summary()
+            total_downloads = summary['total_downloads']
+            failed_downloads = summary['failed_downloads']
+            today_downloads = summary['today_downloads']
+            weekly_downloads = summary['weekly_downloads']
             
-            # Get downloads by platform
-            platform_stats = db.session.query(
-                Download.platform,
-                func.count(Download.id).label('count')
-            ).group_by(Download.platform).all()
-            
-            # Get downloads by media type
-            media_type_stats = db.session.query(
-                Download.media_type,
-                func.count(Download.id).label('count')
-            ).group_by(Download.media_type).all()
+            format_stats = [
+                {'format_type': format_type, 'count': stat['count'], 'total_size': stat['total_size']}
+                for format_type, stat in sorted(summary['formats'].items(), key=lambda item: -item[1]['count'])
+            ]
+            platform_stats = [
+                {'platform': platform, 'count': count}
+                for platform, count in sorted(summary['platforms'].items(), key=lambda item: -item[1])
+            ]
+            media_type_stats = [
+                {'media_type': media_type, 'count': count}
+                for media_type, count in sorted(summary['media_types'].items(), key=lambda item: -item[1])
+            ]
             
             # Get recent downloads (last 10)
             recent_downloads = Download.query.order_by(Download.downloaded_at.desc()).limit(10).all()
@@ -182,40 +305,15 @@ class StatsView(BaseView):
             top_users = db.session.query(
                 User.name,
                 User.email,
-                func.count(Download.id).label('download_count')
-            ).join(Download, User.id == Download.user_id).group_by(User.id, User.name, User.email).order_by(func.count(Download.id).desc()).limit(10).all()
-            
-            # Get failed downloads count
-            failed_downloads = Download.query.filter_by(download_status='failed').count()
-            
-            # Get today's downloads
-            today = datetime.utcnow().date()
-            today_downloads = Download.query.filter(
-                func.date(Download.downloaded_at) == today
-            ).count()
-            
-            # Get downloads from last 7 days
-            last_week = datetime.utcnow() - timedelta(days=7)
-            weekly_downloads = Download.query.filter(
-                Download.downloaded_at >= last_week
-            ).count()
+                UserDownloadSummary.total_downloads.label('download_count')
+            ).join(UserDownloadSummary, User.id == UserDownloadSummary.user_id).order_by(UserDownloadSummary.total_downloads.desc()).limit(10).all()
             
-            # Get most popular format
-            most_popular_format = db.session.query(
-                Download.format_type,
-                func.count(Download.id).label('count')
-            ).group_by(Download.format_type).order_by(func.count(Download.id).desc()).first()
-            
-            # Get most active platform
-            most_active_platform = db.session.query(
-                Download.platform,
-                func.count(Download.id).label('count')
-            ).group_by(Download.platform).order_by(func.count(Download.id).desc()).first()
+            # Most popular format and most active platform
+            most_popular_format = (format_stats[0]['format_type'], format_stats[0]['count']) if format_stats else None
+            most_active_platform = (platform_stats[0]['platform'], platform_stats[0]['count']) if platform_stats else None
             
             # Get average file size
-            avg_file_size = db.session.query(
-                func.avg(Download.file_size)
-            ).filter(Download.file_size.isnot(None)).scalar()
+            avg_file_size = summary['total_bytes'] / summary['sized_count'] if summary['sized_count'] else None
             
             # Calculate success rate
             success_count = total_downloads - failed_downloads
@@ -301,8 +399,22 @@ google = oauth.register(
 )
 
 # Create tables within app context
+# Schema changes ship as migrations in migrations/: a database created here starts
+# complete, so mark it with 'flask db stamp head' once and use 'flask db upgrade'
+# from then on. Databases from before migrations existed need
+# 'flask db stamp 3f1c2b7a9d10' followed by 'flask db upgrade'.
 with app.app_context():
     db.create_all()
+    
+    # Backfill the stats rollup and user summaries for databases created before they existed
+    for aggregate in (DownloadStatsRollup, UserDownloadSummary):
+        try:
+            if aggregate.query.first() is None and db.session.query(Download.id).first() is not None:
+                aggregate.rebuild()
+        except Exception as e:
+            # An older schema that still needs 'flask db upgrade'; the app must start so it can be migrated
+            print(f"Could not build {aggregate.__tablename__}: {str(e)}")
+            db.session.rollback()
 
 @app.route('/')
 def index():
@@ -379,7 +491,8 @@ def get_video_info():
     
     try:
         # Enhanced URL validation with better error messages
-        validation = VideoProcessor.validate_url(url, platform)
+        with STAGE_SECONDS.time(stage='validation'):
+            validation = VideoProcessor.validate_url(url, platform)
         if not validation['success']:
             error_msg = validation.get('error', 'Invalid URL')
             print(f"URL validation failed: {error_msg}")
@@ -396,20 +509,12 @@ def get_video_info():
             error_msg = video_info.get('error', 'Failed to fetch video information')
             
             # Common yt-dlp errors and their user-friendly messages
-            if 'Private video' in error_msg:
-                error_msg = 'This video is private and cannot be downloaded.'
-            elif 'Video unavailable' in error_msg:
-                error_msg = 'This video is unavailable. It may have been removed or made private.'
-            elif 'Sign in to confirm' in error_msg:
-                error_msg = 'This video is age-restricted and cannot be downloaded.'
-            elif 'Unsupported URL' in error_msg:
-                error_msg = 'This URL is not supported. Please check if it\'s a valid YouTube or Instagram URL.'
-            elif 'No video formats found' in error_msg:
-                error_msg = 'No downloadable content found at this URL.'
+            error_msg = VideoDownloader.friendly_error(error_msg, video_info.get('error_class'))
             
             print(f"Video info error: {error_msg}")
             return jsonify({'success': False, 'error': error_msg})
         
+        video_info['thumbnail'] = thumbnail_proxy_url(video_info.get('thumbnail'))
         return jsonify(video_info)
         
     except Exception as e:
@@ -435,94 +540,229 @@ def download():
     if not all([url, platform, media_type]):
         return jsonify({'success': False, 'error': 'Missing parameters'})
     
-    try:
-        # Enhanced URL validation
+    # Enhanced URL validation
+    with STAGE_SECONDS.time(stage='validation'):
         validation = VideoProcessor.validate_url(url, platform)
-        if not validation['success']:
-            return jsonify({'success': False, 'error': validation['error']})
-        
+    if not validation['success']:
+        return jsonify({'success': False, 'error': validation['error']})
+    
+    user_id = session['user']['id']
+    
+    # Identical requests share one download; each user still gets a record
+    canonical_key = VideoProcessor.get_canonical_key(url, platform) or url
+    job = job_queue.submit(
+        user_id,
+        lambda job: run_download(url, platform, media_type, quality, job.update_progress),
+        on_result=lambda job, result: record_download(user_id, url, platform, media_type, quality, format_type, result),
+        key=f'{canonical_key}:{media_type}:{quality}'
+    )
+    
+    return jsonify({'success': True, 'job_id': job.id, 'status': job.status})
+
+def run_download(url, platform, media_type, quality, progress_callback=None):
+    """Download media on a worker thread"""
+    try:
         print("Starting download process...")
-        result = VideoDownloader.download_media(url, media_type, platform, quality)
-        
-        if result and result.get('success'):
-            # Sanitize filename before saving to database
-            sanitized_title = VideoProcessor.sanitize_filename(result['title'])
-            
-            # Save download record with enhanced information
-            download = Download(
-                user_id=session['user']['id'],
-                platform=platform,
-                media_type=media_type,
-                format_type=format_type,
-                video_url=url,
-                video_title=sanitized_title,
-                thumbnail_url=result.get('thumbnail', ''),
-                quality=quality,
-                duration=result.get('duration', 0),
-                file_size=result.get('file_size', 0),
-                filename=result.get('filename', ''),
-                download_status='completed'
-            )
-            db.session.add(download)
-            db.session.commit()
-            
-            # Get file stats
-            filepath = os.path.join('downloads', result['filename'])
-            file_size = VideoProcessor.get_file_size(filepath)
-            
-            print(f"Download successful: {result['filename']}")
-            
-            return jsonify({
-                'success': True,
-                'filename': result['filename'],
-                'title': result['title'],
-                'file_size': file_size,
-                'sanitized_title': sanitized_title,
-                'format_type': format_type,
-                'duration': result.get('duration', 0)
-            })
-        else:
-            error_msg = result.get('error', 'Download failed') if result else 'Download failed'
-            
-            # Save failed download record
-            download = Download(
-                user_id=session['user']['id'],
-                platform=platform,
-                media_type=media_type,
-                format_type=format_type,
-                video_url=url,
-                video_title=f"Failed: {url}",
-                download_status='failed',
-                error_message=error_msg
-            )
-            db.session.add(download)
-            db.session.commit()
-            
-            print(f"Download failed: {error_msg}")
-            return jsonify({'success': False, 'error': error_msg})
+        return VideoDownloader.download_media(url, media_type, platform, quality, progress_callback)
     except Exception as e:
         print(f"Download exception: {str(e)}")
         import traceback
         traceback.print_exc()
-        
-        # Save failed download record
+        return {'success': False, 'error': f'Download error: {str(e)}'}
+
+def record_download(user_id, url, platform, media_type, quality, format_type, result):
+    """Save a finished download for the user and build the job result"""
+    with app.app_context():
         try:
-            download = Download(
-                user_id=session['user']['id'],
-                platform=platform,
-                media_type=media_type,
-                format_type=format_type,
-                video_url=url,
-                video_title=f"Error: {url}",
-                download_status='failed',
-                error_message=str(e)
-            )
-            db.session.add(download)
-            db.session.commit()
-        except:
-            pass
-            
-        return jsonify({'success': False, 'error': f'Download error: {str(e)}'})
+            if result and result.get('success'):
+                # Sanitize filename before saving to database
+                sanitized_title = VideoProcessor.sanitize_filename(result['title'])
+                
+                # Save download record with enhanced information
+                download = Download(
+                    user_id=user_id,
+                    platform=platform,
+                    media_type=media_type,
+                    format_type=format_type,
+                    video_url=url,
+                    video_title=sanitized_title,
+                    thumbnail_url=result.get('thumbnail', ''),
+                    quality=quality,
+                    duration=result.get('duration', 0),
+                    file_size=result.get('file_size', 0),
+                    filename=result.get('filename', ''),
+                    download_status='completed'
+                )
+                with STAGE_SECONDS.time(stage='db_write'):
+                    db.session.add(download)
+                    db.session.commit()
+                
+                # Get file stats
+                filepath = os.path.join('downloads', result['filename'])
+                file_size = VideoProcessor.get_file_size(filepath)
+                
+                print(f"Download successful: {result['filename']}")
+                
+                return {
+                    'success': True,
+                    'filename': result['filename'],
+                    'title': result['title'],
+                    'file_size': file_size,
+                    'sanitized_title': sanitized_title,
+                    'format_type': format_type,
+                    'duration': result.get('duration', 0)
+                }
+            else:
+                error_msg = result.get('error', 'Download failed') if result else 'Download failed'
+                
+                # Save failed download record
+                download = Download(
+                    user_id=user_id,
+                    platform=platform,
+                    media_type=media_type,
+                    format_type=format_type,
+                    video_url=url,
+                    video_title=f"Failed: {url}",
+                    download_status='failed',
+                    error_message=error_msg
+                )
+                with STAGE_SECONDS.time(stage='db_write'):
+                    db.session.add(download)
+                    db.session.commit()
+                
+                print(f"Download failed: {error_msg}")
+                return {'success': False, 'error': error_msg}
+        except Exception as e:
+            print(f"Recording download failed: {str(e)}")
+            db.session.rollback()
+            return {'success': False, 'error': f'Download error: {str(e)}'}
+
+@app.route('/batches', methods=['POST'])
+def create_batch():
+    """Download a playlist URL or a list of URLs as one batch"""
+    if 'user' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    
+    data = request.get_json() or {}
+    url = data.get('url') or ''
+    urls = data.get('urls') or []
+    if not isinstance(url, str) or not isinstance(urls, list) or not all(isinstance(item, str) for item in urls):
+        return jsonify({'success': False, 'error': "'url' must be a string and 'urls' a list of strings"}), 400
+    
+    url = url.strip()
+    media_type = data.get('media_type', '')
+    quality = data.get('quality', 'best')
+    format_type = data.get('format_type', 'mp4')
+    
+    if not media_type or not (url or urls):
+        return jsonify({'success': False, 'error': 'Missing parameters'}), 400
+    
+    max_items = app.config['BATCH_MAX_ITEMS']
+    if len(urls) > max_items:
+        return jsonify({'success': False, 'error': f'A batch can hold at most {max_items} URLs'}), 400
+    
+    user_id = session['user']['id']
+    
+    if url:
+        playlist_id = VideoProcessor.extract_metadata(url, 'youtube').get('playlist_id')
+        if not playlist_id:
+            return jsonify({'success': False, 'error': 'Not a YouTube playlist URL'}), 400
+        
+        batch = job_queue.create_batch(user_id, max_concurrent=app.config['BATCH_MAX_CONCURRENCY'])
+        # Resolving takes a request to YouTube, so it runs on a worker like the downloads
+        job_queue.resolve_batch(
+            batch,
+            lambda job: resolve_playlist_batch(batch, f'https://www.youtube.com/playlist?list={playlist_id}', media_type, quality, format_type)
+        )
+    else:
+        batch = job_queue.create_batch(user_id, title=f'{len(urls)} videos', max_concurrent=app.config['BATCH_MAX_CONCURRENCY'])
+        entries = []
+        with STAGE_SECONDS.time(stage='validation'):
+            for item_url in urls:
+                item_url = item_url.strip()
+                platform = VideoProcessor.get_platform_from_url(item_url)
+                validation = VideoProcessor.validate_url(item_url, platform)
+                entries.append({'url': item_url, 'error': None if validation['success'] else validation['error']})
+        start_batch(batch, entries, media_type, quality, format_type)
+    
+    return jsonify({'success': True, 'batch_id': batch.id})
+
+def resolve_playlist_batch(batch, playlist_url, media_type, quality, format_type):
+    """Flat-extract the playlist on a worker thread, then queue its videos"""
+    playlist = VideoDownloader.get_playlist_entries(playlist_url, limit=app.config['BATCH_MAX_ITEMS'])
+    if not playlist['success']:
+        batch.fail(VideoDownloader.friendly_error(playlist['error'], playlist.get('error_class')))
+        return playlist
+    
+    batch.title = playlist['title']
+    start_batch(batch, playlist['entries'], media_type, quality, format_type)
+    return {'success': True, 'batch_id': batch.id, 'total': len(playlist['entries'])}
+
+def start_batch(batch, entries, media_type, quality, format_type):
+    """Queue a batch's entries as regular download jobs"""
+    user_id = batch.owner
+    
+    def make_job(item):
+        url = item['url']
+        platform = VideoProcessor.get_platform_from_url(url)
+        canonical_key = VideoProcessor.get_canonical_key(url, platform) or url
+        return {
+            'task': lambda job: run_download(url, platform, media_type, quality, job.update_progress),
+            'on_result': lambda job, result: record_download(user_id, url, platform, media_type, quality, format_type, result),
+            'key': f'{canonical_key}:{media_type}:{quality}'
+        }
+    
+    job_queue.run_batch(batch, entries, make_job)
+
+@app.route('/batches/<batch_id>')
+def batch_status(batch_id):
+    if 'user' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    
+    batch = job_queue.get_batch(batch_id)
+    if not batch or batch.owner != session['user']['id']:
+        return jsonify({'success': False, 'error': 'Batch not found'}), 404
+    
+    return jsonify({'success': True, 'batch': batch.to_dict()})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    if 'user' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    
+    job = job_queue.get(job_id)
+    if not job or job.owner != session['user']['id']:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Stream job progress as Server-Sent Events until the job finishes"""
+    if 'user' not in session:
+        return jsonify({'success': False, 'error': 'Not authenticated'}), 401
+    
+    job = job_queue.get(job_id)
+    if not job or job.owner != session['user']['id']:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    def stream():
+        version = None
+        while True:
+            current = job.wait_for_update(version, timeout=15)
+            if current == version:
+                # Keep idle connections open through proxies
+                yield ": keepalive\n\n"
+                continue
+            version = current
+            yield f"data: {json.dumps(job.to_dict())}\n\n"
+            if job.finished:
+                break
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @app.route('/download-file/<filename>')
 def download_file(filename):
@@ -534,11 +774,111 @@ def download_file(filename):
     if error:
         return "File not found", 404
     
-    if os.path.exists(safe_filepath):
-        return send_file(safe_filepath, as_attachment=True)
+    # Keep the evictor off the file until the response has been sent
+    filename = os.path.basename(safe_filepath)
+    if not storage_index.pin(filename):
+        return "File not found", 404
+    
+    try:
+        if not os.path.exists(safe_filepath):
+            storage_index.unpin(filename)
+            return "File not found", 404
+        
+        offload = app.config['FILE_OFFLOAD']
+        if offload == 'x-accel':
+            response = x_accel_response(safe_filepath)
+        else:
+            # The proxy answers Range and conditional requests itself when offloading
+            response = send_file(
+                safe_filepath,
+                as_attachment=True,
+                conditional=offload != 'x-sendfile',
+                etag=True,
+                max_age=app.config['DOWNLOAD_FILE_MAX_AGE']
+            )
+    except Exception:
+        storage_index.unpin(filename)
+        raise
+    
+    response.call_on_close(lambda: storage_index.unpin(filename))
+    
+    # Files belong to a logged in user, so keep them out of shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+def x_accel_response(filepath):
+    """
+    Build a header-only response that lets nginx stream the file
+    
+    Args:
+        filepath (str): Validated path inside the downloads directory
+        
+    Returns:
+        Response: Response carrying X-Accel-Redirect and the attachment headers
+    """
+    response = send_file_headers(
+        os.path.abspath(filepath),
+        request.environ,
+        as_attachment=True,
+        use_x_sendfile=True,
+        conditional=False,
+        max_age=app.config['DOWNLOAD_FILE_MAX_AGE'],
+        response_class=app.response_class
+    )
+    del response.headers['X-Sendfile']
+    response.headers['X-Accel-Redirect'] = app.config['X_ACCEL_PREFIX'].rstrip('/') + '/' + quote(os.path.basename(filepath))
+    return response
+    
+@app.route('/download-zip')
+def download_zip():
+    """Stream several downloads as one ZIP, chosen by ?ids=<id>,<id> or ?batch=<batch id>"""
+    if 'user' not in session:
+        return redirect(url_for('login'))
+    
+    user_id = session['user']['id']
+    archive_name = 'vidsparrow-downloads'
+    
+    batch_id = request.args.get('batch')
+    if batch_id:
+        batch = job_queue.get_batch(batch_id)
+        if not batch or batch.owner != user_id:
+            return "Batch not found", 404
+        filenames = [item['filename'] for item in batch.to_dict()['items'] if item['filename']]
+        if batch.title:
+            archive_name = VideoProcessor.sanitize_filename(batch.title)
     else:
+        download_ids = [download_id for download_id in request.args.get('ids', '').split(',') if download_id]
+        if len(download_ids) > app.config['BATCH_MAX_ITEMS']:
+            return "Too many files", 400
+        filenames = Download.filenames_for_user(user_id, download_ids)
+    
+    # Same checks as /download-file, and each file is pinned until the archive is sent
+    files = []
+    for filename in dict.fromkeys(filenames):
+        safe_filepath, error = VideoProcessor.validate_download_path(filename, 'downloads')
+        if error or not os.path.exists(safe_filepath):
+            continue
+        arcname = os.path.basename(safe_filepath)
+        if storage_index.pin(arcname):
+            files.append((safe_filepath, arcname))
+    
+    if not files:
         return "File not found", 404
     
+    def unpin_all():
+        for _, arcname in files:
+            storage_index.unpin(arcname)
+    
+    response = Response(ZipStream.generate(files), mimetype='application/zip', headers={
+        'Content-Disposition': f"attachment; filename*=UTF-8''{quote(archive_name)}.zip",
+        'X-Accel-Buffering': 'no'
+    })
+    response.call_on_close(unpin_all)
+    response.cache_control.private = True
+    response.cache_control.no_store = True
+    return response
+
 @app.route('/delete-download/<download_id>', methods=['DELETE'])
 def delete_download(download_id):
     if 'user' not in session:
@@ -558,38 +898,99 @@ def clear_all_downloads():
     if 'user' not in session:
         return jsonify({'success': False, 'error': 'Not authenticated'}), 401
     
-    try:
-        count = Download.delete_all_user_downloads(session['user']['id'])
-        return jsonify({'success': True, 'message': f'All {count} downloads cleared successfully'})
-    except Exception as e:
-        logger.error(f"Clear all downloads error: {e}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+    # Large histories take a while to delete, so hand it to a maintenance worker and return the job
+    user_id = session['user']['id']
+    job = job_queue.submit_maintenance(user_id, lambda job: clear_download_history(user_id))
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'message': 'Clearing download history'
+    })
+
+def clear_download_history(user_id):
+    """Delete a user's whole download history on a maintenance worker"""
+    with app.app_context():
+        try:
+            count = Download.delete_all_user_downloads(user_id, chunk_size=app.config['DELETE_CHUNK_SIZE'])
+            return {'success': True, 'deleted_count': count, 'message': f'All {count} downloads cleared successfully'}
+        except Exception as e:
+            logger.error(f"Clear all downloads error: {e}")
+            db.session.rollback()
+            return {'success': False, 'error': str(e)}
 
 @app.route('/profile')
 def profile():
     if 'user' not in session:
         return redirect(url_for('login'))
     
-    user_downloads = Download.query.filter_by(user_id=session['user']['id'])\
-        .order_by(Download.downloaded_at.desc()).all()
+    user_id = session['user']['id']
     
-    # Generate download report
-    download_report = VideoProcessor.generate_download_report(user_downloads)
+    # First page only; script.js loads the rest from /api/downloads while scrolling
+    user_downloads, next_cursor = Download.page_for_user(
+        user_id, limit=app.config['HISTORY_PAGE_SIZE']
+    )
+    
+    # Download report from the user's summary row
+    download_report = UserDownloadSummary.report_for_user(user_id)
     
     return render_template('profile.html', 
                          user=session['user'],
                          downloads=user_downloads,
+                         next_cursor=next_cursor,
                          report=download_report)
 
 @app.route('/api/downloads')
 def get_downloads():
     if 'user' not in session:
-        return jsonify([])
+        return jsonify({'downloads': [], 'next_cursor': None})
+    
+    try:
+        limit = int(request.args.get('limit', app.config['HISTORY_PAGE_SIZE']))
+        limit = max(1, min(limit, app.config['HISTORY_MAX_PAGE_SIZE']))
+        user_downloads, next_cursor = Download.page_for_user(
+            session['user']['id'],
+            cursor=request.args.get('cursor'),
+            limit=limit
+        )
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid cursor or limit'}), 400
     
-    user_downloads = Download.query.filter_by(user_id=session['user']['id'])\
-        .order_by(Download.downloaded_at.desc()).limit(50).all()
+    downloads = [download.to_dict() for download in user_downloads]
+    for download in downloads:
+        download['thumbnail_url'] = thumbnail_proxy_url(download['thumbnail_url'])
     
-    return jsonify([download.to_dict() for download in user_downloads])
+    return jsonify({
+        'downloads': downloads,
+        'next_cursor': next_cursor
+    })
+
+@app.route('/thumb/<token>')
+def thumbnail(token):
+    """Serve a thumbnail from the local cache, fetching and resizing it on first use"""
+    size = request.args.get('size', 'sm')
+    if size not in THUMBNAIL_SIZES:
+        return "Not found", 404
+    
+    try:
+        url = thumbnail_signer.loads(token)
+    except BadSignature:
+        return "Not found", 404
+    
+    cached = thumbnail_cache.get(url, size)
+    if not cached:
+        # The page's onerror handler swaps in the default image
+        return "Not found", 404
+    
+    filepath, etag = cached
+    try:
+        # The token's URL can start serving a new image, so caches revalidate
+        # after max_age; the ETag follows the image bytes and turns that into a 304
+        response = send_file(filepath, etag=etag, max_age=app.config['THUMBNAIL_MAX_AGE'], conditional=True)
+    except FileNotFoundError:
+        return "Not found", 404
+    response.cache_control.public = True
+    return response
 
 @app.route('/admin/cleanup', methods=['POST'])
 def cleanup_files():
@@ -597,9 +998,10 @@ def cleanup_files():
         return jsonify({'success': False, 'error': 'Not authenticated'})
     
     try:
-        VideoProcessor.cleanup_old_files(max_age_hours=24)
-        stats = VideoProcessor.get_download_stats()
-        return jsonify({'success': True, 'stats': stats})
+        # File ages come from the storage index, so only expired files touch the disk
+        removed = storage_index.cleanup(24 * 3600, before_remove=artifact_cache.invalidate_file)
+        stats = storage_index.stats()
+        return jsonify({'success': True, 'removed': removed, 'stats': stats})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -609,11 +1011,29 @@ def get_stats():
         return jsonify({'success': False, 'error': 'Not authenticated'})
     
     try:
-        stats = VideoProcessor.get_download_stats()
+        stats = storage_index.stats()
+        stats['metadata_cache'] = metadata_cache.stats()
+        stats['artifact_cache'] = artifact_cache.stats()
+        stats['download_methods'] = method_stats.stats()
+        stats['bandwidth'] = bandwidth.stats()
+        stats['file_reaper'] = file_reaper.stats()
+        stats['storage_evictor'] = storage_evictor.stats()
+        stats['transcoder'] = transcoder.stats()
+        stats['thumbnails'] = thumbnail_cache.stats()
+        stats['jobs'] = job_queue.stats()
         return jsonify({'success': True, 'stats': stats})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/metrics')
+def metrics():
+    """Pipeline timings, download counters and queue/storage gauges for Prometheus"""
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    
+    return Response(metrics_registry.render(), content_type=metrics_registry.CONTENT_TYPE)
+
 # Debug route for URL testing
 @app.route('/debug-url', methods=['POST'])
 def debug_url():
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: wall-clock only
+    resource = None
+
+FFMPEG = os.environ.get('FFMPEG_PATH', 'ffmpeg')
+MINUTES = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+# (name, source codec args, source file, passthrough output)
+SOURCES = [
+    ('AAC', ['-c:a', 'aac', '-b:a', '128k'], 'source.m4a', 'passthrough.m4a'),
+    ('Opus', ['-c:a', 'libopus', '-b:a', '128k'], 'source.webm', 'passthrough.opus'),
+]
+
+def children_cpu_seconds():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def run_ffmpeg(args):
+    """Run ffmpeg and return (wall seconds, CPU seconds or None)"""
+    cpu_before = children_cpu_seconds()
+    started = time.monotonic()
+    subprocess.run([FFMPEG, '-hide_banner', '-loglevel', 'error', '-nostdin', '-y', *args], check=True)
+    wall = time.monotonic() - started
+    cpu_after = children_cpu_seconds()
+    return wall, (cpu_after - cpu_before) if cpu_before is not None else None
+
+def per_minute(seconds):
+    return f"{seconds / MINUTES:6.3f}s" if seconds is not None else "   n/a"
+
+def bench_audio_passthrough():
+    print(f"Benchmarking MP3 re-encode vs passthrough for {MINUTES:g} minutes of audio...")
+    try:
+        subprocess.run([FFMPEG, '-version'], capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        print("✗ FFmpeg not found; set FFMPEG_PATH or add it to PATH")
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, codec_args, source_name, passthrough_name in SOURCES:
+            source = os.path.join(workdir, source_name)
+            # A synthetic tone stands in for a downloaded audio stream
+            run_ffmpeg(['-f', 'lavfi', '-i', f'sine=frequency=440:duration={MINUTES * 60:g}', *codec_args, source])
+
+            # What the MP3 qualities do: decode and encode with LAME
+            encode_wall, encode_cpu = run_ffmpeg(['-i', source, '-vn', '-codec:a', 'libmp3lame', '-b:a', '192k', os.path.join(workdir, 'encoded.mp3')])
+            # What the m4a/opus qualities do: copy the stream into a new container
+            copy_wall, copy_cpu = run_ffmpeg(['-i', source, '-vn', '-c:a', 'copy', os.path.join(workdir, passthrough_name)])
+
+            print(f"{name} source, per minute of audio:")
+            print(f"  MP3 192k encode   wall {per_minute(encode_wall)}  CPU {per_minute(encode_cpu)}")
+            print(f"  Passthrough copy  wall {per_minute(copy_wall)}  CPU {per_minute(copy_cpu)}")
+            print(f"  ✓ {encode_wall / max(copy_wall, 1e-6):.0f}x faster wall-clock")
+
+if __name__ == "__main__":
+    bench_audio_passthrough()
@@ -0,0 +1,322 @@
+import logging
+import re
+import timeit
+from urllib.parse import urlparse, parse_qs
+
+from utils.url_classifier import UrlClassifier
+from utils.video_processor import VideoProcessor
+
+logger = logging.getLogger(__name__)
+
+URLS = [
+    'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+    'https://www.youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=42&list=PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf',
+    'https://youtu.be/dQw4w9WgXcQ?t=10',
+    'https://m.youtube.com/watch?v=dQw4w9WgXcQ',
+    'https://www.youtube.com/shorts/dQw4w9WgXcQ',
+    'https://www.youtube.com/live/dQw4w9WgXcQ?feature=share',
+    'https://www.instagram.com/p/CxYz123AbC/',
+    'https://www.instagram.com/reel/Cabc_-9XyZ/?igsh=MTc4',
+    'https://www.instagram.com/stories/some.user/3123456789/',
+    'https://example.com/watch?v=dQw4w9WgXcQ',
+]
+
+class LegacyVideoProcessor:
+    """VideoProcessor's URL handling before UrlClassifier, copied verbatim"""
+    
+    @staticmethod
+    def validate_url(url, platform):
+        """
+        Validate if the URL is appropriate for the selected platform
+        
+        Args:
+            url (str): The video URL to validate
+            platform (str): 'youtube' or 'instagram'
+            
+        Returns:
+            dict: Validation result with success status and message
+        """
+        try:
+            parsed_url = urlparse(url)
+            
+            if not parsed_url.scheme in ['http', 'https']:
+                return {'success': False, 'error': 'Invalid URL scheme. URL must start with http:// or https://'}
+            
+            if platform == 'youtube':
+                return LegacyVideoProcessor._validate_youtube_url(url)
+            elif platform == 'instagram':
+                return LegacyVideoProcessor._validate_instagram_url(url)
+            else:
+                return {'success': False, 'error': 'Unsupported platform'}
+                
+        except Exception as e:
+            logger.error(f"URL validation error: {e}")
+            return {'success': False, 'error': 'Invalid URL format'}
+    
+    @staticmethod
+    def _validate_youtube_url(url):
+        """Validate YouTube URL patterns"""
+        # More comprehensive YouTube URL patterns
+        youtube_patterns = [
+            # Standard YouTube watch URLs
+            r'^(https?://)?(www\.)?youtube\.com/watch\?v=[a-zA-Z0-9_-]{11}',
+            # YouTube with additional parameters
+            r'^(https?://)?(www\.)?youtube\.com/watch\?.+&v=[a-zA-Z0-9_-]{11}',
+            # Short youtu.be URLs
+            r'^(https?://)?(www\.)?youtu\.be/[a-zA-Z0-9_-]{11}',
+            # Embed URLs
+            r'^(https?://)?(www\.)?youtube\.com/embed/[a-zA-Z0-9_-]{11}',
+            # Mobile URLs
+            r'^(https?://)?m\.youtube\.com/watch\?v=[a-zA-Z0-9_-]{11}',
+            # YouTube Shorts
+            r'^(https?://)?(www\.)?youtube\.com/shorts/[a-zA-Z0-9_-]{11}',
+            # YouTube live streams
+            r'^(https?://)?(www\.)?youtube\.com/live/[a-zA-Z0-9_-]{11}',
+        ]
+        
+        for pattern in youtube_patterns:
+            if re.search(pattern, url, re.IGNORECASE):
+                video_id = LegacyVideoProcessor._extract_youtube_id(url)
+                if video_id and len(video_id) == 11:
+                    return {
+                        'success': True, 
+                        'video_id': video_id,
+                        'message': 'Valid YouTube URL'
+                    }
+        
+        return {'success': False, 'error': 'Invalid YouTube URL. Please use a standard YouTube video URL.'}
+    
+    @staticmethod
+    def _validate_instagram_url(url):
+        """Validate Instagram URL patterns"""
+        instagram_patterns = [
+            r'^(https?://)?(www\.)?instagram\.com/p/[a-zA-Z0-9_-]+',
+            r'^(https?://)?(www\.)?instagram\.com/reel/[a-zA-Z0-9_-]+',
+            r'^(https?://)?(www\.)?instagram\.com/tv/[a-zA-Z0-9_-]+',
+            r'^(https?://)?(www\.)?instagram\.com/stories/[a-zA-Z0-9_-]+',
+            # Instagram with query parameters
+            r'^(https?://)?(www\.)?instagram\.com/p/[a-zA-Z0-9_-]+/?\?',
+            r'^(https?://)?(www\.)?instagram\.com/reel/[a-zA-Z0-9_-]+/?\?',
+        ]
+        
+        for pattern in instagram_patterns:
+            if re.search(pattern, url, re.IGNORECASE):
+                return {
+                    'success': True,
+                    'message': 'Valid Instagram URL'
+                }
+        
+        return {'success': False, 'error': 'Invalid Instagram URL. Please use a standard Instagram post, reel, or story URL.'}
+    
+    @staticmethod
+    def _extract_youtube_id(url):
+        """Extract YouTube video ID from URL using multiple methods"""
+        try:
+            # Method 1: Standard v= parameter
+            standard_match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11})', url)
+            if standard_match:
+                return standard_match.group(1)
+            
+            # Method 2: youtu.be short URLs
+            short_match = re.search(r'youtu\.be\/([0-9A-Za-z_-]{11})', url)
+            if short_match:
+                return short_match.group(1)
+            
+            # Method 3: Embed URLs
+            embed_match = re.search(r'embed\/([0-9A-Za-z_-]{11})', url)
+            if embed_match:
+                return embed_match.group(1)
+            
+            # Method 4: YouTube Shorts
+            shorts_match = re.search(r'shorts\/([0-9A-Za-z_-]{11})', url)
+            if shorts_match:
+                return shorts_match.group(1)
+            
+            # Method 5: Live streams
+            live_match = re.search(r'live\/([0-9A-Za-z_-]{11})', url)
+            if live_match:
+                return live_match.group(1)
+            
+            # Method 6: Parse query parameters
+            parsed_url = urlparse(url)
+            query_params = parse_qs(parsed_url.query)
+            if 'v' in query_params:
+                video_id = query_params['v'][0]
+                if len(video_id) == 11:
+                    return video_id
+                    
+        except Exception as e:
+            logger.error(f"Error extracting YouTube ID: {e}")
+            
+        return None
+    
+    @staticmethod
+    def extract_metadata(url, platform):
+        """
+        Extract additional metadata from video URL
+        
+        Args:
+            url (str): Video URL
+            platform (str): Platform name
+            
+        Returns:
+            dict: Metadata information
+        """
+        try:
+            if platform == 'youtube':
+                return LegacyVideoProcessor._extract_youtube_metadata(url)
+            elif platform == 'instagram':
+                return LegacyVideoProcessor._extract_instagram_metadata(url)
+            else:
+                return {}
+        except Exception as e:
+            logger.error(f"Metadata extraction error: {e}")
+            return {}
+    
+    @staticmethod
+    def _extract_youtube_metadata(url):
+        """Extract YouTube-specific metadata"""
+        metadata = {}
+        video_id = LegacyVideoProcessor._extract_youtube_id(url)
+        
+        if video_id:
+            metadata.update({
+                'video_id': video_id,
+                'embed_url': f'https://www.youtube.com/embed/{video_id}',
+                'thumbnail_url': f'https://img.youtube.com/vi/{video_id}/maxresdefault.jpg',
+                'thumbnail_url_sd': f'https://img.youtube.com/vi/{video_id}/sddefault.jpg',
+                'thumbnail_url_mq': f'https://img.youtube.com/vi/{video_id}/mqdefault.jpg',
+                'thumbnail_url_hq': f'https://img.youtube.com/vi/{video_id}/hqdefault.jpg',
+                'webpage_url': f'https://www.youtube.com/watch?v={video_id}'
+            })
+        
+        # Extract timestamp from URL if present
+        parsed_url = urlparse(url)
+        query_params = parse_qs(parsed_url.query)
+        
+        if 't' in query_params:
+            metadata['start_time'] = query_params['t'][0]
+        elif 'start' in query_params:
+            metadata['start_time'] = query_params['start'][0]
+        
+        # Extract other parameters
+        if 'list' in query_params:
+            metadata['playlist_id'] = query_params['list'][0]
+            
+        return metadata
+    
+    @staticmethod
+    def _extract_instagram_metadata(url):
+        """Extract Instagram-specific metadata"""
+        metadata = {}
+        
+        try:
+            # Extract post ID from URL
+            patterns = [
+                r'/p/([a-zA-Z0-9_-]+)',
+                r'/reel/([a-zA-Z0-9_-]+)',
+                r'/tv/([a-zA-Z0-9_-]+)',
+                r'/stories/([a-zA-Z0-9_-]+)'
+            ]
+            
+            for pattern in patterns:
+                match = re.search(pattern, url)
+                if match:
+                    metadata['post_id'] = match.group(1)
+                    break
+                    
+            # Extract username from stories
+            stories_match = re.search(r'/stories/([a-zA-Z0-9_.]+)/([0-9]+)', url)
+            if stories_match:
+                metadata['username'] = stories_match.group(1)
+                metadata['story_id'] = stories_match.group(2)
+                
+        except Exception as e:
+            logger.error(f"Error extracting Instagram metadata: {e}")
+            
+        return metadata
+    
+    @staticmethod
+    def get_canonical_key(url, platform=None):
+        """
+        Build a key that is the same for every URL form of one video
+        
+        Args:
+            url (str): Video URL
+            platform (str): Platform name, detected from the URL if omitted
+            
+        Returns:
+            str: Key such as 'youtube:dQw4w9WgXcQ', or None if no ID was found
+        """
+        platform = platform or LegacyVideoProcessor.get_platform_from_url(url)
+        
+        if platform == 'youtube':
+            video_id = LegacyVideoProcessor._extract_youtube_id(url)
+            return f'youtube:{video_id}' if video_id else None
+        elif platform == 'instagram':
+            metadata = LegacyVideoProcessor._extract_instagram_metadata(url)
+            post_id = metadata.get('story_id') or metadata.get('post_id')
+            return f'instagram:{post_id}' if post_id else None
+        return None
+    
+    @staticmethod
+    def get_platform_from_url(url):
+        """
+        Automatically detect platform from URL
+        
+        Args:
+            url (str): Video URL
+            
+        Returns:
+            str: Detected platform ('youtube', 'instagram', or 'unknown')
+        """
+        if not url:
+            return 'unknown'
+            
+        url_lower = url.lower()
+        
+        if any(domain in url_lower for domain in ['youtube.com', 'youtu.be']):
+            return 'youtube'
+        elif 'instagram.com' in url_lower:
+            return 'instagram'
+        else:
+            return 'unknown'
+
+
+def legacy_request(url):
+    """validate_url, get_canonical_key and extract_metadata as they used to run"""
+    platform = LegacyVideoProcessor.get_platform_from_url(url)
+    if platform == 'unknown':
+        return None
+    LegacyVideoProcessor.validate_url(url, platform)
+    LegacyVideoProcessor.get_canonical_key(url, platform)
+    return LegacyVideoProcessor.extract_metadata(url, platform)
+
+def classifier_request(url):
+    """The same work through the classifier"""
+    platform = VideoProcessor.get_platform_from_url(url)
+    if platform == 'unknown':
+        return None
+    VideoProcessor.validate_url(url, platform)
+    VideoProcessor.get_canonical_key(url, platform)
+    return VideoProcessor.extract_metadata(url, platform)
+
+def uncached_request(url):
+    UrlClassifier.classify.cache_clear()
+    return classifier_request(url)
+
+def bench(label, func, rounds=2000):
+    seconds = timeit.timeit(lambda: [func(url) for url in URLS], number=rounds)
+    per_url = seconds / (rounds * len(URLS)) * 1e6
+    print(f"{label:<28} {per_url:8.2f} µs per URL")
+    return per_url
+
+def bench_url_classifier():
+    print("Benchmarking URL classification (validate + canonical key + metadata)...")
+    legacy = bench('Pattern lists (before)', legacy_request)
+    uncached = bench('Classifier, cold cache', uncached_request)
+    cached = bench('Classifier, warm cache', classifier_request)
+    print(f"Speedup: {legacy / uncached:.1f}x cold, {legacy / cached:.1f}x warm")
+
+if __name__ == "__main__":
+    bench_url_classifier()
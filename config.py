@@ -9,8 +9,75 @@ class Config:
     GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
     
     # Database
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///vidsparrow.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///vidsparrow.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Session configuration
-    PERMANENT_SESSION_LIFETIME = timedelta(days=7)
\ No newline at end of file
+    PERMANENT_SESSION_LIFETIME = timedelta(days=7)
+    
+    # Download job queue. Jobs, their coalescing and their progress streams live in
+    # this process's memory, so run a single app process with several threads, e.g.
+    # gunicorn --workers 1 --threads 16. The app refuses to start when more workers
+    # are configured (WEB_CONCURRENCY, gunicorn's default worker count, or --workers)
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+    DOWNLOAD_WORKERS = int(os.environ.get('DOWNLOAD_WORKERS', 4))
+    JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', 3600))
+    
+    # Preview metadata cache
+    METADATA_CACHE_SIZE = int(os.environ.get('METADATA_CACHE_SIZE', 512))
+    METADATA_CACHE_TTL = int(os.environ.get('METADATA_CACHE_TTL', 600))  # seconds
+    
+    # Index of finished downloads reused across requests and restarts
+    ARTIFACT_INDEX_PATH = os.environ.get('ARTIFACT_INDEX_PATH', os.path.join('instance', 'artifact_index.json'))
+    
+    # Total download bandwidth shared by all active transfers (bytes/s, 0 = unlimited)
+    BANDWIDTH_LIMIT = int(os.environ.get('BANDWIDTH_LIMIT', 20 * 1024 * 1024))
+    # Parallel fragment downloads for HLS/DASH formats
+    CONCURRENT_FRAGMENTS = int(os.environ.get('CONCURRENT_FRAGMENTS', 4))
+    
+    # Let the front proxy send downloaded files: '' (Flask sends them), 'x-accel' (nginx) or 'x-sendfile' (Apache/lighttpd)
+    FILE_OFFLOAD = os.environ.get('FILE_OFFLOAD', '').lower()
+    # nginx location marked 'internal' that aliases the downloads directory
+    X_ACCEL_PREFIX = os.environ.get('X_ACCEL_PREFIX', '/protected-downloads/')
+    # How long browsers may reuse a downloaded file without revalidating (seconds)
+    DOWNLOAD_FILE_MAX_AGE = int(os.environ.get('DOWNLOAD_FILE_MAX_AGE', 3600))
+    
+    # Download history page sizes (profile page and /api/downloads)
+    HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', 20))
+    HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', 100))
+    
+    # Rows removed per transaction when clearing a download history
+    DELETE_CHUNK_SIZE = int(os.environ.get('DELETE_CHUNK_SIZE', 500))
+    
+    # Snapshot of the downloads directory index and how often it is checked against the disk (seconds)
+    STORAGE_INDEX_PATH = os.environ.get('STORAGE_INDEX_PATH', os.path.join('instance', 'storage_index.json'))
+    STORAGE_RECONCILE_INTERVAL = int(os.environ.get('STORAGE_RECONCILE_INTERVAL', 600))
+    
+    # Disk budget for the downloads directory; least recently used files are evicted past it (bytes, 0 = no limit)
+    STORAGE_MAX_BYTES = int(os.environ.get('STORAGE_MAX_BYTES', 10 * 1024 ** 3))
+    # Free space to keep on the disk holding the downloads directory (bytes, 0 = ignore)
+    STORAGE_MIN_FREE_BYTES = int(os.environ.get('STORAGE_MIN_FREE_BYTES', 1024 ** 3))
+    # How often the evictor checks the budget (seconds); every finished download also wakes it
+    STORAGE_EVICT_INTERVAL = int(os.environ.get('STORAGE_EVICT_INTERVAL', 60))
+    # Files used within this many seconds are never evicted
+    STORAGE_EVICT_IDLE_SECONDS = int(os.environ.get('STORAGE_EVICT_IDLE_SECONDS', 300))
+    
+    # Playlist and batch downloads: items running at once per batch, and the largest batch accepted
+    BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', 2))
+    BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 200))
+    
+    # MP3 encodes running at once (defaults to the CPU count) and the ffmpeg binary they use
+    TRANSCODE_WORKERS = int(os.environ.get('TRANSCODE_WORKERS', os.cpu_count() or 2))
+    FFMPEG_PATH = os.environ.get('FFMPEG_PATH', 'ffmpeg')
+    # MP3 qualities encoded from the same decode as every MP3 request and cached,
+    # e.g. 'best,192k,128k,64k' (empty = only the requested quality)
+    MP3_LADDER = [quality.strip() for quality in os.environ.get('MP3_LADDER', '').split(',') if quality.strip()]
+    
+    # Local copies of remote thumbnails: where they live, their disk budget (bytes) and how long
+    # browsers and the local cache keep one before checking for a new image (seconds)
+    THUMBNAIL_CACHE_DIR = os.environ.get('THUMBNAIL_CACHE_DIR', os.path.join('instance', 'thumbnails'))
+    THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get('THUMBNAIL_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+    THUMBNAIL_MAX_AGE = int(os.environ.get('THUMBNAIL_MAX_AGE', 24 * 3600))
+    
+    # Bearer token Prometheus must send to scrape /metrics; leave empty to serve it openly
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
\ No newline at end of file
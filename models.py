@@ -1,5 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from datetime import datetime, timedelta
+import base64
 import uuid
 
 db = SQLAlchemy()
@@ -14,6 +17,7 @@ class User(db.Model):
     
     # Relationship with downloads
     downloads = db.relationship('Download', backref='user', lazy=True, cascade='all, delete-orphan')
+    download_summary = db.relationship('UserDownloadSummary', uselist=False, lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -26,6 +30,19 @@ class User(db.Model):
         }
 
 class Download(db.Model):
+    __table_args__ = (
+        # Per-user history, newest first; id breaks ties for keyset pagination
+        db.Index('ix_download_user_downloaded_at', 'user_id', 'downloaded_at', 'id'),
+        # Failed download counts
+        db.Index('ix_download_status', 'download_status'),
+        # Per-platform activity over time
+        db.Index('ix_download_platform_downloaded_at', 'platform', 'downloaded_at'),
+        # Most recent downloads across all users (admin)
+        db.Index('ix_download_downloaded_at', 'downloaded_at'),
+        # Whether any record still uses a file, before it is reaped
+        db.Index('ix_download_filename', 'filename'),
+    )
+    
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
     platform = db.Column(db.String(50), nullable=False)  # youtube, instagram, etc.
@@ -33,6 +50,13 @@ class Download(db.Model):
     video_url = db.Column(db.Text, nullable=False)
     video_title = db.Column(db.Text, nullable=False)
     thumbnail_url = db.Column(db.Text)
+    format_type = db.Column(db.String(20))  # mp3, mp4
+    quality = db.Column(db.String(20))  # best, 720p, 192k, etc.
+    duration = db.Column(db.Integer)  # seconds
+    file_size = db.Column(db.BigInteger)  # bytes
+    filename = db.Column(db.String(500))  # file name inside the downloads directory
+    download_status = db.Column(db.String(20), nullable=False, default='completed', server_default='completed')  # completed, failed
+    error_message = db.Column(db.Text)
     downloaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -43,9 +67,76 @@ class Download(db.Model):
             'video_url': self.video_url,
             'video_title': self.video_title,
             'thumbnail_url': self.thumbnail_url,
+            'format_type': self.format_type,
+            'quality': self.quality,
+            'duration': self.duration,
+            'file_size': self.file_size,
+            'filename': self.filename,
+            'download_status': self.download_status,
+            'error_message': self.error_message,
             'downloaded_at': self.downloaded_at.isoformat() if self.downloaded_at else None
         }
     
+    @staticmethod
+    def encode_cursor(download):
+        """Opaque cursor pointing just past download in newest-first order"""
+        raw = f"{download.downloaded_at.isoformat()}|{download.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Split a cursor back into its (downloaded_at, id) position
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        downloaded_at, download_id = raw.split('|', 1)
+        return datetime.fromisoformat(downloaded_at), download_id
+    
+    @staticmethod
+    def page_for_user(user_id, cursor=None, limit=20):
+        """
+        Get one page of a user's downloads, newest first
+        
+        Seeks on (downloaded_at, id) instead of using OFFSET, so every page
+        costs the same however deep into the history it is.
+        
+        Args:
+            user_id (str): Owner of the downloads
+            cursor (str): Cursor returned with the previous page, None for the first page
+            limit (int): Page size
+            
+        Returns:
+            tuple: (list of Download, cursor for the next page or None)
+        """
+        query = Download.query.filter_by(user_id=user_id)
+        if cursor:
+            query = query.filter(
+                db.tuple_(Download.downloaded_at, Download.id) < Download.decode_cursor(cursor)
+            )
+        
+        downloads = query.order_by(
+            Download.downloaded_at.desc(), Download.id.desc()
+        ).limit(limit + 1).all()
+        
+        if len(downloads) > limit:
+            downloads = downloads[:limit]
+            return downloads, Download.encode_cursor(downloads[-1])
+        return downloads, None
+    
+    @staticmethod
+    def filenames_for_user(user_id, download_ids):
+        """Files of the given downloads that belong to the user, in the order asked for"""
+        rows = db.session.query(Download.id, Download.filename).filter(
+            Download.user_id == user_id,
+            Download.id.in_(download_ids),
+            Download.filename.isnot(None)
+        ).all()
+        filenames = dict(rows)
+        return [filenames[download_id] for download_id in download_ids if filenames.get(download_id)]
+    
     @staticmethod
     def delete_download(download_id, user_id):
         """Delete a download record by ID if it belongs to the user"""
@@ -57,10 +148,472 @@ class Download(db.Model):
         return False
     
     @staticmethod
-    def delete_all_user_downloads(user_id):
-        """Delete all download records for a user"""
-        downloads = Download.query.filter_by(user_id=user_id).all()
-        for download in downloads:
-            db.session.delete(download)
+    def delete_all_user_downloads(user_id, chunk_size=500):
+        """
+        Delete all download records for a user
+        
+        Rows go in bulk DELETEs of chunk_size, each committed on its own so
+        SQLite's write lock is only ever held briefly. Bulk deletes skip the
+        mapper listeners, so the stats rollup is adjusted per chunk and the
+        user's summary rebuilt at the end.
+        
+        Args:
+            user_id (str): Owner of the downloads
+            chunk_size (int): Rows deleted per transaction
+            
+        Returns:
+            int: Number of records deleted
+        """
+        table = Download.__table__
+        columns = [Download.id, Download.filename] + [
+            getattr(Download, name) for name in DownloadStatsRollup.FIELDS
+        ]
+        deleted = 0
+        
+        while True:
+            rows = db.session.execute(
+                db.select(*columns).where(Download.user_id == user_id).limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            
+            db.session.execute(table.delete().where(table.c.id.in_([row.id for row in rows])))
+            DownloadStatsRollup.apply_many(db.session.connection(), [row._mapping for row in rows], -1)
+            release_files(db.session, [row.filename for row in rows])
+            db.session.commit()
+            deleted += len(rows)
+        
+        UserDownloadSummary.rebuild(user_id)
+        return deleted
+
+class DownloadStatsRollup(db.Model):
+    """Download counts and byte totals per day, platform, media type, format and status"""
+    __tablename__ = 'download_stats_rollup'
+    
+    day = db.Column(db.Date, primary_key=True)
+    platform = db.Column(db.String(50), primary_key=True)
+    media_type = db.Column(db.String(10), primary_key=True)
+    format_type = db.Column(db.String(20), primary_key=True)  # '' when unknown
+    download_status = db.Column(db.String(20), primary_key=True)  # '' when unknown
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    sized_count = db.Column(db.Integer, nullable=False, default=0)  # rows with a file_size, for averages
+    
+    FIELDS = ('downloaded_at', 'platform', 'media_type', 'format_type', 'download_status', 'file_size')
+    
+    @staticmethod
+    def bucket(values):
+        """Primary key of the rollup row a download with these values counts towards"""
+        downloaded_at = values['downloaded_at'] or datetime.utcnow()
+        return {
+            'day': downloaded_at.date(),
+            'platform': values['platform'],
+            'media_type': values['media_type'],
+            'format_type': values['format_type'] or '',
+            'download_status': values['download_status'] or ''
+        }
+    
+    @staticmethod
+    def apply(connection, values, sign):
+        """
+        Add (sign=1) or remove (sign=-1) one download from its rollup row
+        
+        Runs on the flush connection, so the rollup commits or rolls back
+        together with the download row itself.
+        
+        Args:
+            connection: Connection of the flush in progress
+            values (dict): Download values for every name in FIELDS
+            sign (int): 1 for an added download, -1 for a removed one
+        """
+        sized = 1 if values['file_size'] is not None else 0
+        DownloadStatsRollup._adjust(
+            connection, DownloadStatsRollup.bucket(values), sign, sign * (values['file_size'] or 0), sign * sized
+        )
+    
+    @staticmethod
+    def apply_many(connection, rows, sign):
+        """Add or remove many downloads with one statement per rollup row they touch"""
+        buckets = {}
+        for values in rows:
+            key = tuple(DownloadStatsRollup.bucket(values).items())
+            totals = buckets.setdefault(key, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += values['file_size'] or 0
+            totals[2] += 1 if values['file_size'] is not None else 0
+        
+        for key, (count, total_bytes, sized_count) in buckets.items():
+            DownloadStatsRollup._adjust(connection, dict(key), sign * count, sign * total_bytes, sign * sized_count)
+    
+    @staticmethod
+    def _adjust(connection, key, count, total_bytes, sized_count):
+        """Add the given deltas to one rollup row, creating or dropping it as needed"""
+        table = DownloadStatsRollup.__table__
+        where = [table.c[name] == value for name, value in key.items()]
+        
+        if count > 0:
+            # The first downloads of a new day can be flushed by two sessions at once
+            _upsert(connection, table, dict(key, count=count, total_bytes=total_bytes, sized_count=sized_count),
+                    update=lambda new: {
+                        'count': table.c.count + new['count'],
+                        'total_bytes': table.c.total_bytes + new['total_bytes'],
+                        'sized_count': table.c.sized_count + new['sized_count']
+                    })
+            return
+        
+        connection.execute(
+            table.update().where(*where).values(
+                count=table.c.count + count,
+                total_bytes=table.c.total_bytes + total_bytes,
+                sized_count=table.c.sized_count + sized_count
+            )
+        )
+        if count < 0:
+            connection.execute(table.delete().where(*where, table.c.count <= 0))
+    
+    @staticmethod
+    def rebuild():
+        """Recompute the whole rollup from the downloads table"""
+        table = DownloadStatsRollup.__table__
+        day = db.func.date(Download.downloaded_at)
+        rows = db.session.query(
+            day,
+            Download.platform,
+            Download.media_type,
+            db.func.coalesce(Download.format_type, ''),
+            db.func.coalesce(Download.download_status, ''),
+            db.func.count(Download.id),
+            db.func.coalesce(db.func.sum(Download.file_size), 0),
+            db.func.count(Download.file_size)
+        ).group_by(
+            day, Download.platform, Download.media_type, Download.format_type, Download.download_status
+        )
+        
+        db.session.execute(table.delete())
+        db.session.execute(table.insert().from_select(
+            ['day', 'platform', 'media_type', 'format_type', 'download_status',
+             'count', 'total_bytes', 'sized_count'],
+            rows
+        ))
         db.session.commit()
-        return len(downloads)
\ No newline at end of file
+    
+    @staticmethod
+    def summary(today=None):
+        """
+        Aggregate the rollup for the admin statistics page
+        
+        Args:
+            today (date): Day the 'today' and 'last 7 days' figures count from
+            
+        Returns:
+            dict: Totals and per-format/platform/media type breakdowns
+        """
+        today = today or datetime.utcnow().date()
+        week_start = today - timedelta(days=6)
+        
+        summary = {
+            'total_downloads': 0,
+            'failed_downloads': 0,
+            'today_downloads': 0,
+            'weekly_downloads': 0,
+            'total_bytes': 0,
+            'sized_count': 0,
+            'formats': {},
+            'platforms': {},
+            'media_types': {}
+        }
+        
+        for row in DownloadStatsRollup.query.all():
+            summary['total_downloads'] += row.count
+            summary['total_bytes'] += row.total_bytes
+            summary['sized_count'] += row.sized_count
+            if row.download_status == 'failed':
+                summary['failed_downloads'] += row.count
+            if row.day == today:
+                summary['today_downloads'] += row.count
+            if row.day >= week_start:
+                summary['weekly_downloads'] += row.count
+            
+            fmt = summary['formats'].setdefault(row.format_type or None, {'count': 0, 'total_size': 0})
+            fmt['count'] += row.count
+            fmt['total_size'] += row.total_bytes
+            summary['platforms'][row.platform] = summary['platforms'].get(row.platform, 0) + row.count
+            summary['media_types'][row.media_type] = summary['media_types'].get(row.media_type, 0) + row.count
+        
+        return summary
+
+class UserDownloadSummary(db.Model):
+    """Per-user download counts kept current as downloads are added and removed"""
+    __tablename__ = 'user_download_summary'
+    
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), primary_key=True)
+    total_downloads = db.Column(db.Integer, nullable=False, default=0)
+    platform_counts = db.Column(db.JSON, nullable=False, default=dict)
+    media_type_counts = db.Column(db.JSON, nullable=False, default=dict)
+    daily_counts = db.Column(db.JSON, nullable=False, default=dict)  # 'YYYY-MM-DD' -> count for the last WINDOW_DAYS days
+    first_download_at = db.Column(db.DateTime)
+    last_download_at = db.Column(db.DateTime)
+    
+    FIELDS = ('user_id', 'platform', 'media_type', 'downloaded_at')
+    WINDOW_DAYS = 30
+    
+    @staticmethod
+    def apply(connection, values, sign):
+        """
+        Add (sign=1) or remove (sign=-1) one download from its owner's summary
+        
+        Args:
+            connection: Connection of the flush in progress
+            values (dict): Download values for every name in FIELDS
+            sign (int): 1 for an added download, -1 for a removed one
+        """
+        table = UserDownloadSummary.__table__
+        locked_row = table.select().where(table.c.user_id == values['user_id']).with_for_update()
+        row = connection.execute(locked_row).first()
+        if row is None:
+            if sign < 0:
+                return
+            # A user's first downloads can be flushed by two sessions at once: one
+            # creates the empty row, the other waits for it and both lock it below
+            _upsert(connection, table, {
+                'user_id': values['user_id'],
+                'total_downloads': 0,
+                'platform_counts': {},
+                'media_type_counts': {},
+                'daily_counts': {}
+            })
+            row = connection.execute(locked_row).first()
+        
+        downloaded_at = values['downloaded_at'] or datetime.utcnow()
+        cutoff = (datetime.utcnow().date() - timedelta(days=UserDownloadSummary.WINDOW_DAYS - 1)).isoformat()
+        day = downloaded_at.date().isoformat()
+        
+        platform_counts = dict(row.platform_counts)
+        media_type_counts = dict(row.media_type_counts)
+        daily_counts = {d: count for d, count in row.daily_counts.items() if d >= cutoff}
+        _bump(platform_counts, values['platform'], sign)
+        _bump(media_type_counts, values['media_type'], sign)
+        if day >= cutoff:
+            _bump(daily_counts, day, sign)
+        
+        first_download_at = row.first_download_at
+        last_download_at = row.last_download_at
+        if sign > 0:
+            first_download_at = min(first_download_at or downloaded_at, downloaded_at)
+            last_download_at = max(last_download_at or downloaded_at, downloaded_at)
+        elif downloaded_at in (first_download_at, last_download_at):
+            # The oldest or newest download went away; the user's history index answers this directly
+            first_download_at, last_download_at = connection.execute(
+                db.select(db.func.min(Download.downloaded_at), db.func.max(Download.downloaded_at))
+                .where(Download.user_id == values['user_id'])
+            ).first()
+        
+        summary = {
+            'total_downloads': row.total_downloads + sign,
+            'platform_counts': platform_counts,
+            'media_type_counts': media_type_counts,
+            'daily_counts': daily_counts,
+            'first_download_at': first_download_at,
+            'last_download_at': last_download_at
+        }
+        connection.execute(table.update().where(table.c.user_id == values['user_id']).values(**summary))
+    
+    @staticmethod
+    def rebuild(user_id=None):
+        """Recompute every user's summary, or just user_id's, from the downloads table"""
+        summaries = {}
+        
+        def scoped(query):
+            return query.filter(Download.user_id == user_id) if user_id else query
+        
+        def summary_for(owner_id):
+            return summaries.setdefault(owner_id, {
+                'user_id': owner_id,
+                'total_downloads': 0,
+                'platform_counts': {},
+                'media_type_counts': {},
+                'daily_counts': {},
+                'first_download_at': None,
+                'last_download_at': None
+            })
+        
+        for owner_id, platform, count in scoped(db.session.query(
+            Download.user_id, Download.platform, db.func.count(Download.id)
+        )).group_by(Download.user_id, Download.platform):
+            summary = summary_for(owner_id)
+            summary['platform_counts'][platform] = count
+            summary['total_downloads'] += count
+        
+        for owner_id, media_type, count in scoped(db.session.query(
+            Download.user_id, Download.media_type, db.func.count(Download.id)
+        )).group_by(Download.user_id, Download.media_type):
+            summary_for(owner_id)['media_type_counts'][media_type] = count
+        
+        for owner_id, first_download_at, last_download_at in scoped(db.session.query(
+            Download.user_id, db.func.min(Download.downloaded_at), db.func.max(Download.downloaded_at)
+        )).group_by(Download.user_id):
+            summary = summary_for(owner_id)
+            summary['first_download_at'] = first_download_at
+            summary['last_download_at'] = last_download_at
+        
+        window_start = datetime.combine(
+            datetime.utcnow().date() - timedelta(days=UserDownloadSummary.WINDOW_DAYS - 1), datetime.min.time()
+        )
+        day = db.func.date(Download.downloaded_at)
+        for owner_id, download_day, count in scoped(db.session.query(
+            Download.user_id, day, db.func.count(Download.id)
+        )).filter(Download.downloaded_at >= window_start).group_by(Download.user_id, day):
+            summary_for(owner_id)['daily_counts'][str(download_day)] = count
+        
+        table = UserDownloadSummary.__table__
+        if user_id:
+            db.session.execute(table.delete().where(table.c.user_id == user_id))
+        else:
+            db.session.execute(table.delete())
+        if summaries:
+            db.session.execute(table.insert(), list(summaries.values()))
+        db.session.commit()
+    
+    @staticmethod
+    def report_for_user(user_id):
+        """Profile page report for a user, read from their summary row"""
+        summary = db.session.get(UserDownloadSummary, user_id)
+        return (summary or UserDownloadSummary(user_id=user_id)).to_report()
+    
+    def to_report(self):
+        """
+        Build the profile page report
+        
+        Returns:
+            dict: Download statistics report
+        """
+        platform_counts = self.platform_counts or {}
+        media_type_counts = self.media_type_counts or {}
+        daily_counts = self.daily_counts or {}
+        today = datetime.utcnow().date()
+        
+        def downloads_since(days):
+            # Whole calendar days (UTC), today included
+            cutoff = (today - timedelta(days=days - 1)).isoformat()
+            return sum(count for day, count in daily_counts.items() if day >= cutoff)
+        
+        most_used_platform = max(platform_counts, key=platform_counts.get) if platform_counts else 'None'
+        return {
+            'total_downloads': self.total_downloads or 0,
+            'platform_distribution': dict(platform_counts),
+            'media_type_distribution': dict(media_type_counts),
+            'recent_downloads_7_days': downloads_since(7),
+            'most_used_platform': most_used_platform,
+            'most_used_media_type': max(media_type_counts, key=media_type_counts.get) if media_type_counts else 'None',
+            'first_download': self.first_download_at.isoformat() if self.first_download_at else None,
+            'last_download': self.last_download_at.isoformat() if self.last_download_at else None,
+            # Figures shown on the profile page
+            'youtube_downloads': platform_counts.get('youtube', 0),
+            'instagram_downloads': platform_counts.get('instagram', 0),
+            'mp4_downloads': media_type_counts.get('mp4', 0),
+            'mp3_downloads': media_type_counts.get('mp3', 0),
+            'last_30_days': downloads_since(30),
+            'favorite_platform': most_used_platform
+        }
+
+def _upsert(connection, table, values, update=None):
+    """
+    Insert a row, or change the existing row with the same primary key
+    
+    A single statement on SQLite, PostgreSQL and MySQL, so concurrent
+    writers of a new key never both insert and fail on the unique key.
+    
+    Args:
+        connection: Connection of the flush in progress
+        table: Table to write
+        values (dict): The new row
+        update (callable): Given the proposed row's columns, returns the
+            column values for an existing row; None leaves that row as is
+    """
+    keys = [column.name for column in table.primary_key]
+    dialect = connection.dialect.name
+    
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(table).values(**values)
+        if update is None:
+            statement = statement.on_conflict_do_nothing(index_elements=keys)
+        else:
+            statement = statement.on_conflict_do_update(index_elements=keys, set_=update(statement.excluded))
+        connection.execute(statement)
+    elif dialect in ('mysql', 'mariadb'):
+        statement = mysql.insert(table).values(**values)
+        changes = update(statement.inserted) if update else {key: table.c[key] for key in keys}
+        connection.execute(statement.on_duplicate_key_update(**changes))
+    else:
+        # No upsert syntax to rely on: update first, insert if no row matched
+        where = [table.c[key] == values[key] for key in keys]
+        matched = connection.execute(db.select(*[table.c[key] for key in keys]).where(*where)).first()
+        if matched is None:
+            connection.execute(table.insert().values(**values))
+        elif update is not None:
+            proposed = {name: db.literal(value, table.c[name].type) for name, value in values.items()}
+            connection.execute(table.update().where(*where).values(**update(proposed)))
+
+def _bump(counts, key, sign):
+    """Change a count in place, dropping keys that reach zero"""
+    counts[key] = counts.get(key, 0) + sign
+    if counts[key] <= 0:
+        del counts[key]
+
+def _download_values(target, fields):
+    return {name: getattr(target, name) for name in fields}
+
+def _previous_values(target, fields):
+    """Values of fields before the pending update, where they were loaded"""
+    state = db.inspect(target)
+    values = {}
+    for name in fields:
+        history = state.attrs[name].history
+        values[name] = history.deleted[0] if history.deleted else getattr(target, name)
+    return values
+
+# Download count for each user, loaded in the same query as the user and sortable
+User.download_count = db.column_property(
+    db.func.coalesce(
+        db.select(UserDownloadSummary.total_downloads)
+        .where(UserDownloadSummary.user_id == User.id)
+        .correlate_except(UserDownloadSummary)
+        .scalar_subquery(),
+        0
+    )
+)
+
+# Derived tables kept in step with Download by the listeners below
+DOWNLOAD_AGGREGATES = (DownloadStatsRollup, UserDownloadSummary)
+
+@event.listens_for(Download, 'after_insert')
+def _aggregates_after_insert(mapper, connection, target):
+    for aggregate in DOWNLOAD_AGGREGATES:
+        aggregate.apply(connection, _download_values(target, aggregate.FIELDS), 1)
+
+@event.listens_for(Download, 'after_delete')
+def _aggregates_after_delete(mapper, connection, target):
+    for aggregate in DOWNLOAD_AGGREGATES:
+        aggregate.apply(connection, _download_values(target, aggregate.FIELDS), -1)
+    release_files(db.inspect(target).session, [target.filename])
+
+def release_files(session, filenames):
+    """
+    Note files whose records are being deleted in session
+    
+    They are collected in session.info['released_files'] so the app can
+    reap them once the delete has committed.
+    """
+    if session is not None:
+        session.info.setdefault('released_files', set()).update(f for f in filenames if f)
+
+@event.listens_for(Download, 'after_update')
+def _aggregates_after_update(mapper, connection, target):
+    """Move the download between aggregate rows when an edit changes what they count"""
+    for aggregate in DOWNLOAD_AGGREGATES:
+        old_values = _previous_values(target, aggregate.FIELDS)
+        new_values = _download_values(target, aggregate.FIELDS)
+        if old_values != new_values:
+            aggregate.apply(connection, old_values, -1)
+            aggregate.apply(connection, new_values, 1)
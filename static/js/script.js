@@ -164,6 +164,8 @@ class VidSparrow {
         { value: "192k", label: "High Quality (192kbps)" },
         { value: "128k", label: "Good Quality (128kbps)" },
         { value: "64k", label: "Standard Quality (64kbps)" },
+        { value: "m4a", label: "Original AAC (m4a, no re-encoding)" },
+        { value: "opus", label: "Original Opus (ogg, no re-encoding)" },
       ];
     } else {
       if (platform === "youtube") {
@@ -409,9 +411,16 @@ class VidSparrow {
       });
 
       console.log("Download response status:", response.status);
-      const data = await response.json();
+      let data = await response.json();
       console.log("Download response data:", data);
 
+      // The server queues the download and hands back a job to follow
+      if (data.success && data.job_id) {
+        this.updateProgress("Waiting in queue...", 0);
+        data = await this.waitForJob(data.job_id);
+        console.log("Download job result:", data);
+      }
+
       if (data.success) {
         this.updateProgress("Download completed! Preparing file...", 100);
 
@@ -469,10 +478,85 @@ class VidSparrow {
     }
   }
 
+  waitForJob(jobId, onProgress = (job) => this.showJobProgress(job)) {
+    if (!window.EventSource) {
+      return this.pollJob(jobId, onProgress);
+    }
+
+    return new Promise((resolve) => {
+      const source = new EventSource(`/jobs/${jobId}/events`);
+
+      source.onmessage = (event) => {
+        const job = JSON.parse(event.data);
+        if (job.status === "completed" || job.status === "failed") {
+          source.close();
+          resolve(job.result || { success: false, error: job.error });
+          return;
+        }
+        onProgress(job);
+      };
+
+      // Fall back to polling if the stream is cut (e.g. by a buffering proxy)
+      source.onerror = () => {
+        source.close();
+        resolve(this.pollJob(jobId, onProgress));
+      };
+    });
+  }
+
+  async pollJob(jobId, onProgress = (job) => this.showJobProgress(job)) {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+
+      const response = await fetch(`/jobs/${jobId}`);
+      const data = await response.json();
+      if (!data.success) {
+        return data;
+      }
+
+      const job = data.job;
+      if (job.status === "completed" || job.status === "failed") {
+        return job.result || { success: false, error: job.error };
+      }
+
+      onProgress(job);
+    }
+  }
+
+  showJobProgress(job) {
+    const progress = job.progress || {};
+
+    if (job.status === "queued") {
+      this.updateProgress("Waiting in queue...", 0);
+    } else if (progress.stage === "downloading") {
+      const percent = progress.percent || 0;
+      const parts = [`Downloading... ${percent.toFixed(1)}%`];
+      if (progress.speed) {
+        parts.push(`${this.formatBytes(progress.speed)}/s`);
+      }
+      if (progress.eta) {
+        parts.push(`ETA ${this.formatDuration(progress.eta)}`);
+      }
+      this.updateProgress(parts.join(" • "), percent);
+    } else if (
+      progress.stage === "finished" ||
+      progress.stage === "postprocessing"
+    ) {
+      this.updateProgress("Processing file...", 100);
+    } else if (progress.stage === "waiting_for_encoder") {
+      this.updateProgress("Waiting for encoder...", 100);
+    } else if (progress.stage === "encoding") {
+      this.updateProgress("Encoding MP3...", 100);
+    } else {
+      this.updateProgress("Fetching video info...", 0);
+    }
+  }
+
   async loadRecentDownloads() {
     try {
-      const response = await fetch("/api/downloads");
-      const downloads = await response.json();
+      const response = await fetch("/api/downloads?limit=10");
+      const data = await response.json();
+      const downloads = data.downloads || [];
 
       const container = document.getElementById("recentDownloadsList");
       if (!container) return;
@@ -672,7 +756,12 @@ class VidSparrow {
         },
       });
 
-      const data = await response.json();
+      let data = await response.json();
+
+      // The history is cleared by a background job
+      if (data.success && data.job_id) {
+        data = await this.waitForJob(data.job_id, () => {});
+      }
 
       if (data.success) {
         this.showToast(`All downloads cleared successfully`, "success");
@@ -732,6 +821,18 @@ class VidSparrow {
     }
   }
 
+  formatBytes(bytes) {
+    if (!bytes) return "0 B";
+
+    const units = ["B", "KB", "MB", "GB"];
+    let i = 0;
+    while (bytes >= 1024 && i < units.length - 1) {
+      bytes /= 1024;
+      i++;
+    }
+    return `${bytes.toFixed(1)} ${units[i]}`;
+  }
+
   formatViews(count) {
     if (!count) return "Unknown";
 
@@ -881,6 +982,124 @@ class VidSparrow {
   }
 }
 
+// Infinite scroll for the profile page download history
+class HistoryScroller {
+  constructor(list, sentinel) {
+    this.list = list;
+    this.sentinel = sentinel;
+    this.cursor = list.dataset.nextCursor || null;
+    this.loading = false;
+
+    if (!this.cursor) {
+      this.sentinel.classList.add("hidden");
+      return;
+    }
+
+    if ("IntersectionObserver" in window) {
+      // Start fetching a little before the end of the list comes into view
+      this.observer = new IntersectionObserver(
+        (entries) => {
+          if (entries.some((entry) => entry.isIntersecting)) {
+            this.loadMore();
+          }
+        },
+        { rootMargin: "400px" }
+      );
+      this.observer.observe(this.sentinel);
+    }
+    this.sentinel.addEventListener("click", () => this.loadMore());
+  }
+
+  async loadMore() {
+    if (this.loading || !this.cursor) return;
+    this.loading = true;
+    this.sentinel.classList.add("loading");
+
+    try {
+      const response = await fetch(
+        `/api/downloads?cursor=${encodeURIComponent(this.cursor)}`
+      );
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || "Failed to load downloads");
+      }
+
+      if (data.downloads.length) {
+        const emptyState = this.list.querySelector(".no-downloads");
+        if (emptyState) emptyState.remove();
+        this.list.insertAdjacentHTML(
+          "beforeend",
+          data.downloads.map((download) => this.renderItem(download)).join("")
+        );
+      }
+
+      this.cursor = data.next_cursor;
+      if (!this.cursor) {
+        this.sentinel.classList.add("hidden");
+        if (this.observer) this.observer.disconnect();
+      }
+    } catch (error) {
+      console.error("Error loading download history:", error);
+    } finally {
+      this.loading = false;
+      this.sentinel.classList.remove("loading");
+    }
+  }
+
+  renderItem(download) {
+    // Same markup the profile template renders for the first page
+    const title = this.escapeHtml(download.video_title);
+    const platform = this.escapeHtml(download.platform);
+    const downloadedAt = download.downloaded_at || "";
+    return `
+            <div class="download-item">
+              <div class="download-thumbnail">
+                <img
+                  src="${this.escapeHtml(
+                    download.thumbnail_url ||
+                      "/static/images/default-thumbnail.jpg"
+                  )}"
+                  alt="${title}"
+                  onerror="this.src='/static/images/default-thumbnail.jpg'"
+                />
+                <div class="platform-badge ${platform}">
+                  <i class="fab fa-${platform}"></i>
+                </div>
+              </div>
+              <div class="download-info">
+                <h3 class="download-title">${title}</h3>
+                <div class="download-meta">
+                  <span class="media-type ${this.escapeHtml(
+                    download.media_type
+                  )}">
+                    ${this.escapeHtml(download.media_type.toUpperCase())}
+                  </span>
+                  <span class="download-date">
+                    ${downloadedAt.slice(0, 10)} at ${downloadedAt.slice(11, 16)}
+                  </span>
+                  <span class="platform-tag"> ${platform} </span>
+                </div>
+              </div>
+              <div class="download-actions">
+                <button
+                  class="action-btn delete-btn"
+                  onclick="deleteDownload('${this.escapeHtml(download.id)}')"
+                  title="Delete from history"
+                >
+                  <i class="fas fa-trash"></i>
+                  Delete
+                </button>
+              </div>
+            </div>`;
+  }
+
+  escapeHtml(text) {
+    const div = document.createElement("div");
+    div.textContent = text == null ? "" : String(text);
+    return div.innerHTML.replace(/"/g, "&quot;").replace(/'/g, "&#39;");
+  }
+}
+
 const style = document.createElement("style");
 style.textContent = `
     @keyframes slideIn {
@@ -1175,6 +1394,16 @@ document.head.appendChild(style);
 
 // Initialize the application when DOM is loaded
 document.addEventListener("DOMContentLoaded", () => {
+  // The profile page only needs the history scroller
+  const historyList = document.getElementById("historyList");
+  if (historyList) {
+    window.historyScroller = new HistoryScroller(
+      historyList,
+      document.getElementById("historySentinel")
+    );
+    return;
+  }
+
   console.log("DOM loaded, initializing VidSparrow...");
   window.vidSparrow = new VidSparrow();
 });
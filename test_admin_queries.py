@@ -0,0 +1,91 @@
+import os
+import re
+import tempfile
+
+from sqlalchemy import event
+
+# Keep the app off the real database and instance files for the whole test run
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['STORAGE_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'storage_index.json')
+
+from app import app
+from models import db, User, Download
+
+def add_users(count, downloads_per_user):
+    with app.app_context():
+        for i in range(count):
+            user = User(google_id=f'google-{i}', email=f'user{i}@example.com', name=f'User {i}')
+            db.session.add(user)
+            db.session.flush()
+            for _ in range(downloads_per_user(i)):
+                db.session.add(Download(
+                    user_id=user.id,
+                    platform='youtube',
+                    media_type='mp3',
+                    format_type='mp3',
+                    video_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+                    video_title='Test video'
+                ))
+        db.session.commit()
+
+def clear_users():
+    with app.app_context():
+        for user in User.query.all():
+            db.session.delete(user)
+        db.session.commit()
+
+def admin_client():
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = {'id': 'admin', 'name': 'Admin', 'email': 'admin@example.com'}
+    return client
+
+def count_queries(client, path):
+    """Fetch path and return (response, number of SQL statements it ran)"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return response, len(statements)
+
+def test_user_admin_query_count_is_constant():
+    client = admin_client()
+
+    add_users(3, lambda i: 2)
+    response, few_users_queries = count_queries(client, '/admin/user/')
+    assert response.status_code == 200
+    clear_users()
+
+    add_users(20, lambda i: i % 5)
+    response, many_users_queries = count_queries(client, '/admin/user/')
+    assert response.status_code == 200
+    clear_users()
+
+    # One count query and one list query, however many users are on the page
+    assert many_users_queries == few_users_queries
+    assert many_users_queries <= 2
+
+def test_user_admin_sorts_by_download_count():
+    client = admin_client()
+    add_users(5, lambda i: i)
+
+    # download_count is the fifth column of the list
+    response = client.get('/admin/user/?sort=4&desc=1')
+    clear_users()
+
+    assert response.status_code == 200
+    names = re.findall(r'User \d', response.get_data(as_text=True))
+    assert names[:5] == ['User 4', 'User 3', 'User 2', 'User 1', 'User 0']
+
+if __name__ == "__main__":
+    test_user_admin_query_count_is_constant()
+    test_user_admin_sorts_by_download_count()
+    print("Admin query tests passed")
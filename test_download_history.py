@@ -0,0 +1,125 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Keep the app off the real database and instance files for the whole test run
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['STORAGE_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'storage_index.json')
+
+from app import app
+from models import db, User, Download, DownloadStatsRollup, UserDownloadSummary
+
+def add_user(index, downloads):
+    """Create a user with downloads given as (platform, media_type, downloaded_at, file_size) tuples"""
+    with app.app_context():
+        user = User(google_id=f'history-{index}', email=f'history{index}@example.com', name=f'History {index}')
+        db.session.add(user)
+        db.session.flush()
+        for platform, media_type, downloaded_at, file_size in downloads:
+            db.session.add(Download(
+                user_id=user.id,
+                platform=platform,
+                media_type=media_type,
+                format_type=media_type,
+                video_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+                video_title='Test video',
+                file_size=file_size,
+                downloaded_at=downloaded_at
+            ))
+        db.session.commit()
+        return user.id
+
+def clear_users():
+    with app.app_context():
+        for user in User.query.all():
+            db.session.delete(user)
+        db.session.commit()
+
+def client_for(user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user'] = {'id': user_id, 'name': 'History', 'email': 'history@example.com'}
+    return client
+
+def rollup_rows():
+    return sorted(
+        (row.day, row.platform, row.media_type, row.format_type, row.download_status,
+         row.count, row.total_bytes, row.sized_count)
+        for row in DownloadStatsRollup.query.all()
+    )
+
+def test_cursor_pages_cover_the_history_once():
+    now = datetime(2026, 10, 1, 12, 0)
+    # Three downloads share a timestamp, so pages must break ties on id
+    times = [now, now, now, now - timedelta(minutes=1), now - timedelta(hours=1), now - timedelta(days=1), now - timedelta(days=2)]
+    user_id = add_user(0, [('youtube', 'mp4', downloaded_at, 10) for downloaded_at in times])
+
+    with app.app_context():
+        expected = [download.id for download in Download.query.filter_by(user_id=user_id)
+                    .order_by(Download.downloaded_at.desc(), Download.id.desc())]
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = Download.page_for_user(user_id, cursor=cursor, limit=3)
+            seen += [download.id for download in page]
+            if cursor is None:
+                break
+    assert seen == expected
+
+    client = client_for(user_id)
+    first = client.get('/api/downloads?limit=4').get_json()
+    second = client.get(f"/api/downloads?limit=4&cursor={first['next_cursor']}").get_json()
+    assert [d['id'] for d in first['downloads'] + second['downloads']] == expected
+    assert second['next_cursor'] is None
+    clear_users()
+
+def test_malformed_cursor_is_rejected():
+    user_id = add_user(1, [('youtube', 'mp4', datetime(2026, 10, 1), 10)])
+    client = client_for(user_id)
+
+    for cursor in ['not-base64!', 'bm8tc2VwYXJhdG9y', 'bm90LWEtZGF0ZXwxMjM']:
+        response = client.get(f'/api/downloads?cursor={cursor}')
+        assert response.status_code == 400, cursor
+        assert response.get_json()['success'] is False
+
+    assert client.get('/api/downloads?limit=many').status_code == 400
+    clear_users()
+
+def test_clearing_a_history_keeps_the_aggregates_in_step():
+    today = datetime.utcnow().replace(microsecond=0)
+    keeper = add_user(2, [
+        ('youtube', 'mp4', today, 100),
+        ('instagram', 'mp3', today - timedelta(days=3), None),
+    ])
+    leaver = add_user(3, [
+        ('youtube', 'mp4', today, 50),
+        ('youtube', 'mp3', today - timedelta(days=1), 20),
+        ('youtube', 'mp3', today - timedelta(days=40), 30),
+    ])
+
+    with app.app_context():
+        # Chunks smaller than the history exercise the per-chunk rollup adjustment
+        assert Download.delete_all_user_downloads(leaver, chunk_size=2) == 3
+
+        incremental = rollup_rows()
+        DownloadStatsRollup.rebuild()
+        assert rollup_rows() == incremental
+
+        summary = DownloadStatsRollup.summary(today.date())
+        assert summary['total_downloads'] == 2
+        assert summary['total_bytes'] == 100
+        assert summary['platforms'] == {'youtube': 1, 'instagram': 1}
+
+        assert UserDownloadSummary.report_for_user(leaver)['total_downloads'] == 0
+        report = UserDownloadSummary.report_for_user(keeper)
+        assert report['total_downloads'] == 2
+        assert report['platform_distribution'] == {'youtube': 1, 'instagram': 1}
+        assert report['recent_downloads_7_days'] == 2
+    clear_users()
+
+if __name__ == "__main__":
+    test_cursor_pages_cover_the_history_once()
+    test_malformed_cursor_is_rejected()
+    test_clearing_a_history_keeps_the_aggregates_in_step()
+    print("Download history tests passed")
@@ -0,0 +1,59 @@
+import os
+import tempfile
+
+import yt_dlp
+
+from utils.downloader import VideoDownloader
+
+def carousel_info():
+    """What extraction returns for an Instagram carousel: a playlist of two videos"""
+    entries = [
+        {
+            'id': f'item{i}',
+            'title': f'Item {i}',
+            'ext': 'mp4',
+            'extractor': 'instagram',
+            'extractor_key': 'Instagram',
+            'webpage_url': 'https://www.instagram.com/p/CxYz123AbC/',
+            'formats': [{
+                'format_id': 'dash-720',
+                'url': f'https://scontent.cdninstagram.com/item{i}.mp4',
+                'ext': 'mp4',
+                'vcodec': 'avc1',
+                'acodec': 'mp4a',
+            }],
+        }
+        for i in (1, 2)
+    ]
+    return {
+        '_type': 'playlist',
+        'id': 'CxYz123AbC',
+        'title': 'Carousel',
+        'extractor': 'instagram',
+        'extractor_key': 'Instagram',
+        'webpage_url': 'https://www.instagram.com/p/CxYz123AbC/',
+        'entries': entries,
+    }
+
+def test_playlist_info_replays_from_cache():
+    # _extract_info caches this form of the extraction
+    cached = yt_dlp.YoutubeDL.sanitize_info(carousel_info())
+    snapshot = yt_dlp.YoutubeDL.sanitize_info(carousel_info())
+    snapshot['epoch'] = cached['epoch']
+
+    ydl_opts = {
+        'simulate': True,
+        'quiet': True,
+        'outtmpl': os.path.join(tempfile.mkdtemp(), '%(title)s.%(ext)s'),
+    }
+    # Every fallback method replays the same cached dict
+    for _ in range(2):
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = VideoDownloader._download_with_info(ydl, cached['webpage_url'], cached)
+        assert [entry['id'] for entry in info['entries']] == ['item1', 'item2']
+
+    assert cached == snapshot
+
+if __name__ == "__main__":
+    test_playlist_info_replays_from_cache()
+    print("Downloader tests passed")
@@ -0,0 +1,110 @@
+import threading
+import time
+
+from utils.job_queue import DownloadJobQueue
+
+def blocked_task(release, result):
+    """Task that holds its worker until release is set, then returns result"""
+    calls = []
+
+    def task(job):
+        calls.append(job.id)
+        release.wait(5)
+        return result
+    return task, calls
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+def wait_for(jobs):
+    wait_until(lambda: all(job.finished for job in jobs))
+
+def test_identical_downloads_share_one_run():
+    queue = DownloadJobQueue(max_workers=2)
+    release = threading.Event()
+    task, calls = blocked_task(release, {'success': True, 'filename': 'Song [abc].best.mp4'})
+    recorded = []
+
+    def on_result(job, result):
+        recorded.append(job.owner)
+        return {**result, 'owner': job.owner}
+
+    leader = queue.submit('alice', task, on_result=on_result, key='youtube:abc:mp4:best')
+    follower = queue.submit('bob', task, on_result=on_result, key='youtube:abc:mp4:best')
+    other = queue.submit('carol', task, on_result=on_result, key='youtube:abc:mp4:720p')
+    release.set()
+    wait_for([leader, follower, other])
+
+    # Two runs: one for best, shared by two users, and one for 720p
+    assert len(calls) == 2
+    assert queue.stats()['coalesced'] == 1
+    assert leader.result == {'success': True, 'filename': 'Song [abc].best.mp4', 'owner': 'alice'}
+    assert follower.result == {'success': True, 'filename': 'Song [abc].best.mp4', 'owner': 'bob'}
+    assert sorted(recorded) == ['alice', 'bob', 'carol']
+
+def test_failed_leader_fails_followers_and_frees_the_key():
+    queue = DownloadJobQueue(max_workers=2)
+    release = threading.Event()
+
+    def crash(job):
+        release.wait(5)
+        raise RuntimeError('HTTP Error 429')
+
+    leader = queue.submit('alice', crash, key='youtube:abc:mp3:best')
+    follower = queue.submit('bob', lambda job: {'success': True}, key='youtube:abc:mp3:best')
+    release.set()
+    wait_for([leader, follower])
+
+    assert leader.status == 'failed' and follower.status == 'failed'
+    assert 'HTTP Error 429' in follower.error
+
+    # The failed run is not reused: the next request downloads again
+    retry = queue.submit('carol', lambda job: {'success': True}, key='youtube:abc:mp3:best')
+    wait_for([retry])
+    assert retry.status == 'completed'
+    assert queue.stats()['coalesced'] == 1
+
+def test_batch_aggregates_item_progress():
+    queue = DownloadJobQueue(max_workers=4)
+    batch = queue.create_batch('alice', title='Playlist', max_concurrent=2)
+    release = threading.Event()
+    outcomes = {
+        'https://youtu.be/aaaaaaaaaaa': {'success': True, 'filename': 'a.mp4'},
+        'https://youtu.be/bbbbbbbbbbb': {'success': False, 'error': 'Private video'},
+        'https://youtu.be/ccccccccccc': {'success': True, 'filename': 'c.mp4'},
+    }
+
+    def make_job(item):
+        def task(job):
+            release.wait(5)
+            return outcomes[item['url']]
+        return {'task': task, 'key': item['url']}
+
+    entries = [{'url': url} for url in outcomes] + [{'url': 'not a url', 'error': 'Invalid URL'}]
+    queue.run_batch(batch, entries, make_job)
+
+    # Two running, one waiting for a slot, one rejected up front
+    progress = batch.to_dict()
+    assert progress['status'] == 'running'
+    assert progress['total'] == 4
+    assert progress['counts']['failed'] == 1
+    assert progress['counts']['queued'] + progress['counts']['running'] == 3
+    assert progress['percent'] == 25.0
+
+    release.set()
+    wait_until(lambda: batch.finished)
+
+    progress = batch.to_dict()
+    assert progress['status'] == 'completed'
+    assert progress['counts'] == {'queued': 0, 'running': 0, 'completed': 2, 'failed': 2}
+    assert progress['percent'] == 100.0
+    assert [item['filename'] for item in progress['items']] == ['a.mp4', None, 'c.mp4', None]
+
+if __name__ == "__main__":
+    test_identical_downloads_share_one_run()
+    test_failed_leader_fails_followers_and_frees_the_key()
+    test_batch_aggregates_item_progress()
+    print("Job queue tests passed")
@@ -0,0 +1,79 @@
+import os
+import tempfile
+
+from utils.artifact_cache import ArtifactCache
+from utils.storage_index import StorageIndex
+
+def write_file(download_dir, filename, size):
+    with open(os.path.join(download_dir, filename), 'wb') as f:
+        f.write(b'x' * size)
+
+def test_artifact_cache_drops_changed_files():
+    download_dir = tempfile.mkdtemp()
+    cache = ArtifactCache(download_dir)
+    cache.load(os.path.join(download_dir, 'artifact_index.json'))
+    key = ArtifactCache.make_key('youtube:dQw4w9WgXcQ', 'mp3', '192k')
+
+    write_file(download_dir, 'Song [dQw4w9WgXcQ].192k.mp3', 100)
+    cache.put(key, {'filename': 'Song [dQw4w9WgXcQ].192k.mp3', 'title': 'Song'})
+    assert cache.get(key)['file_size'] == 100
+
+    # Rewritten with a different size: not the file that was cached
+    write_file(download_dir, 'Song [dQw4w9WgXcQ].192k.mp3', 50)
+    assert cache.get(key) is None
+    assert not cache.contains(key)
+
+    write_file(download_dir, 'Song [dQw4w9WgXcQ].192k.mp3', 100)
+    cache.put(key, {'filename': 'Song [dQw4w9WgXcQ].192k.mp3', 'title': 'Song'})
+    os.remove(os.path.join(download_dir, 'Song [dQw4w9WgXcQ].192k.mp3'))
+    assert cache.get(key) is None
+
+    # The index survives a restart
+    write_file(download_dir, 'Song [dQw4w9WgXcQ].192k.mp3', 100)
+    cache.put(key, {'filename': 'Song [dQw4w9WgXcQ].192k.mp3', 'title': 'Song'})
+    reloaded = ArtifactCache(download_dir)
+    reloaded.load(os.path.join(download_dir, 'artifact_index.json'))
+    assert reloaded.get(key)['title'] == 'Song'
+    assert cache.stats()['hits'] == 1
+
+def test_pinned_files_are_never_evicted():
+    download_dir = tempfile.mkdtemp()
+    index = StorageIndex(download_dir)
+    for filename in ('old.mp4', 'served.mp4', 'new.mp4', 'merging.f137.mp4', 'writing.mp4.part'):
+        write_file(download_dir, filename, 10)
+        index.add(filename)
+    index.touch('new.mp4')
+
+    assert index.pin('served.mp4')
+    candidates = [filename for filename, _ in index.least_recently_used()]
+    assert 'served.mp4' not in candidates
+    assert 'merging.f137.mp4' not in candidates and 'writing.mp4.part' not in candidates
+    assert candidates[-1] == 'new.mp4'
+
+    removed = []
+    assert index.delete('served.mp4', before_remove=removed.append) is None
+    assert index.delete('old.mp4', before_remove=removed.append) == 10
+    assert removed == ['old.mp4']
+    assert os.path.exists(os.path.join(download_dir, 'served.mp4'))
+    assert not os.path.exists(os.path.join(download_dir, 'old.mp4'))
+    assert index.stats()['total_files'] == 4
+
+    index.unpin('served.mp4')
+    assert index.delete('served.mp4') == 10
+    assert index.stats()['total_size_bytes'] == 30
+
+def test_files_being_deleted_cannot_be_pinned():
+    download_dir = tempfile.mkdtemp()
+    index = StorageIndex(download_dir)
+    write_file(download_dir, 'clip.mp4', 10)
+    index.add('clip.mp4')
+
+    pinned = []
+    index.delete('clip.mp4', before_remove=lambda filename: pinned.append(index.pin(filename)))
+    assert pinned == [False]
+
+if __name__ == "__main__":
+    test_artifact_cache_drops_changed_files()
+    test_pinned_files_are_never_evicted()
+    test_files_being_deleted_cannot_be_pinned()
+    print("Storage tests passed")
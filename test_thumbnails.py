@@ -0,0 +1,59 @@
+import hashlib
+import os
+import tempfile
+
+# Keep the app off the real database and instance files for the whole test run
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['STORAGE_INDEX_PATH'] = os.path.join(tempfile.mkdtemp(), 'storage_index.json')
+
+from app import app, thumbnail_cache, thumbnail_proxy_url, thumbnail_signer
+
+THUMBNAIL_URL = 'https://i.ytimg.com/vi/dQw4w9WgXcQ/hqdefault.jpg'
+
+def seed_thumbnail(url, size, data):
+    """Put an image in the cache as if it had just been fetched"""
+    thumbnail_cache.configure(cache_dir=tempfile.mkdtemp())
+    key = hashlib.sha256(f'{size}:{url}'.encode('utf-8')).hexdigest()
+    return thumbnail_cache._store(key, data, '.jpg')
+
+def token_of(proxy_url):
+    return proxy_url.split('/thumb/', 1)[1].split('?', 1)[0]
+
+def test_token_round_trip():
+    with app.test_request_context():
+        proxy_url = thumbnail_proxy_url(THUMBNAIL_URL, size='md')
+        assert thumbnail_proxy_url('') == ''
+    assert proxy_url.startswith('/thumb/') and proxy_url.endswith('?size=md')
+    # The page only ever sees the signed token, never the remote URL
+    assert 'ytimg' not in proxy_url
+    assert thumbnail_signer.loads(token_of(proxy_url)) == THUMBNAIL_URL
+
+    _, etag = seed_thumbnail(THUMBNAIL_URL, 'md', b'\xff\xd8\xff jpeg bytes')
+    client = app.test_client()
+    response = client.get(proxy_url)
+    assert response.status_code == 200
+    assert response.data == b'\xff\xd8\xff jpeg bytes'
+    assert response.headers['ETag'] == f'"{etag}"'
+    assert 'immutable' not in response.headers['Cache-Control']
+
+    revalidated = client.get(proxy_url, headers={'If-None-Match': f'"{etag}"'})
+    assert revalidated.status_code == 304
+
+def test_forged_tokens_and_sizes_are_refused():
+    with app.test_request_context():
+        proxy_url = thumbnail_proxy_url(THUMBNAIL_URL)
+    token = token_of(proxy_url)
+    client = app.test_client()
+
+    assert client.get(f'/thumb/{token[:-2]}xx').status_code == 404
+    assert client.get(f'/thumb/{token}?size=huge').status_code == 404
+
+    # A validly signed URL on another host is never fetched
+    with app.test_request_context():
+        foreign = thumbnail_proxy_url('https://attacker.example/track.png')
+    assert client.get(foreign).status_code == 404
+
+if __name__ == "__main__":
+    test_token_round_trip()
+    test_forged_tokens_and_sizes_are_refused()
+    print("Thumbnail tests passed")
@@ -0,0 +1,57 @@
+from utils.url_classifier import UrlClassifier
+from utils.video_processor import VideoProcessor
+
+def test_every_form_of_a_video_shares_one_key():
+    forms = [
+        'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+        'https://youtube.com/watch?v=dQw4w9WgXcQ&t=42s',
+        'https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ',
+        'https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabcdefghijk',
+        'https://youtu.be/dQw4w9WgXcQ?t=10',
+        'youtu.be/dQw4w9WgXcQ',
+        'https://www.youtube.com/shorts/dQw4w9WgXcQ',
+        'https://www.youtube.com/embed/dQw4w9WgXcQ',
+        'https://www.youtube.com/live/dQw4w9WgXcQ?si=abc',
+    ]
+    assert {VideoProcessor.get_canonical_key(url) for url in forms} == {'youtube:dQw4w9WgXcQ'}
+    assert {UrlClassifier.classify(url).canonical_url for url in forms} == {'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}
+
+def test_instagram_keys():
+    assert VideoProcessor.get_canonical_key('https://www.instagram.com/p/CxYz123AbC/?igsh=x') == 'instagram:CxYz123AbC'
+    assert VideoProcessor.get_canonical_key('https://instagram.com/reel/CxYz123AbC') == 'instagram:CxYz123AbC'
+    assert UrlClassifier.classify('https://www.instagram.com/REEL/CxYz123AbC/').canonical_url == 'https://www.instagram.com/reel/CxYz123AbC/'
+
+    story = UrlClassifier.classify('https://www.instagram.com/stories/some.user/3141592653/')
+    assert story.kind == 'story'
+    assert story.canonical_id == '3141592653'
+
+def test_urls_without_a_video_have_no_key():
+    for url in [
+        '',
+        'https://www.youtube.com/watch?v=tooshort',
+        'https://www.youtube.com/watch?v=dQw4w9WgXcQextra',
+        'https://www.youtube.com/playlist?list=PLabcdefghijk',
+        'https://www.instagram.com/some.user/',
+        'https://example.com/watch?v=dQw4w9WgXcQ',
+    ]:
+        assert VideoProcessor.get_canonical_key(url) is None, url
+
+    # A key is only given for the platform the caller expects
+    assert VideoProcessor.get_canonical_key('https://youtu.be/dQw4w9WgXcQ', 'instagram') is None
+
+def test_playlist_and_start_time():
+    playlist = UrlClassifier.classify('https://www.youtube.com/playlist?list=PLabcdefghijk')
+    assert playlist.kind == 'playlist'
+    assert playlist.playlist_id == 'PLabcdefghijk'
+    assert playlist.canonical_url == 'https://www.youtube.com/playlist?list=PLabcdefghijk'
+
+    video = UrlClassifier.classify('http://youtu.be/dQw4w9WgXcQ?t=1m30s')
+    assert video.start_time == '1m30s'
+    assert video.scheme == 'http'
+
+if __name__ == "__main__":
+    test_every_form_of_a_video_shares_one_key()
+    test_instagram_keys()
+    test_urls_without_a_video_have_no_key()
+    test_playlist_and_start_time()
+    print("URL classifier tests passed")
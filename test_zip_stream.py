@@ -0,0 +1,38 @@
+import io
+import os
+import tempfile
+import zipfile
+
+from utils.zip_stream import ZipStream
+
+def test_streamed_archive_holds_every_file():
+    workdir = tempfile.mkdtemp()
+    contents = {
+        'Song [abc].320k.mp3': os.urandom(200 * 1024),
+        'Clip [def].720p.mp4': os.urandom(10),
+        'empty.m4a': b'',
+    }
+    files = []
+    for arcname, data in contents.items():
+        filepath = os.path.join(workdir, arcname)
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        files.append((filepath, arcname))
+    files.append((os.path.join(workdir, 'missing.mp4'), 'missing.mp4'))
+
+    chunks = list(ZipStream.generate(files, chunk_size=16 * 1024))
+    # Streamed in pieces rather than built whole
+    assert len(chunks) > 10
+    assert max(len(chunk) for chunk in chunks) < 64 * 1024
+
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == list(contents)
+        for arcname, data in contents.items():
+            info = archive.getinfo(arcname)
+            assert info.compress_type == zipfile.ZIP_STORED
+            assert archive.read(arcname) == data
+
+if __name__ == "__main__":
+    test_streamed_archive_holds_every_file()
+    print("Zip stream tests passed")
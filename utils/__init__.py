@@ -1,5 +1,15 @@
 # utils/__init__.py
 from .downloader import VideoDownloader
 from .video_processor import VideoProcessor
+from .job_queue import DownloadJobQueue
+from .metadata_cache import MetadataCache
+from .artifact_cache import ArtifactCache
+from .method_stats import MethodStats
+from .bandwidth import BandwidthScheduler
+from .file_reaper import FileReaper
+from .storage_index import StorageIndex
+from .storage_evictor import StorageEvictor
+from .url_classifier import UrlClassifier
+from .metrics import MetricsRegistry
 
-__all__ = ['VideoDownloader', 'VideoProcessor']
\ No newline at end of file
+__all__ = ['VideoDownloader', 'VideoProcessor', 'DownloadJobQueue', 'MetadataCache', 'ArtifactCache', 'MethodStats', 'BandwidthScheduler', 'FileReaper', 'StorageIndex', 'StorageEvictor', 'UrlClassifier', 'MetricsRegistry']
\ No newline at end of file
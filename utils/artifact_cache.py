@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class ArtifactCache:
+    """Index of finished downloads so repeat requests can reuse the file on disk"""
+
+    def __init__(self, download_dir='downloads'):
+        self.download_dir = download_dir
+        self.index_path = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(canonical_key, media_type, quality):
+        """
+        Build the cache key for one rendition of a video
+
+        Args:
+            canonical_key (str): Platform and video ID, e.g. 'youtube:dQw4w9WgXcQ'
+            media_type (str): 'mp4' or 'mp3'
+            quality (str): Requested quality
+
+        Returns:
+            str: Key such as 'youtube:dQw4w9WgXcQ:mp3:192k'
+        """
+        return f'{canonical_key}:{media_type}:{quality}'
+
+    def load(self, index_path):
+        """Load the persisted index and keep saving changes to it"""
+        with self._lock:
+            self.index_path = index_path
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+                logger.info(f"Loaded {len(self._entries)} cached artifacts from {index_path}")
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read artifact index {index_path}: {e}")
+                self._entries = {}
+
+    def get(self, key):
+        """Return the cached download result for key, or None if missing or the file is gone"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._is_valid(entry):
+                self.hits += 1
+                return dict(entry)
+
+            if entry:
+                logger.info(f"Dropping stale artifact {entry['filename']}")
+                del self._entries[key]
+                self._save()
+            self.misses += 1
+            return None
+
+    def contains(self, key):
+        """Whether key has a usable entry, without counting a hit or miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return bool(entry) and self._is_valid(entry)
+
+    def put(self, key, result):
+        """Remember a successful download result"""
+        filepath = os.path.join(self.download_dir, result['filename'])
+        try:
+            file_size = os.path.getsize(filepath)
+        except OSError:
+            return
+
+        with self._lock:
+            self._entries[key] = {
+                'filename': result['filename'],
+                'title': result.get('title', ''),
+                'thumbnail': result.get('thumbnail', ''),
+                'duration': result.get('duration', 0),
+                'file_size': file_size,
+                'created_at': time.time()
+            }
+            self._save()
+
+    def invalidate_file(self, filename):
+        """Forget every entry that points at filename"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry['filename'] == filename]
+            for key in stale:
+                del self._entries[key]
+            if stale:
+                self._save()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0
+            }
+
+    def _is_valid(self, entry):
+        """The file must still exist with the size it had when cached"""
+        try:
+            filepath = os.path.join(self.download_dir, entry['filename'])
+            return os.path.getsize(filepath) == entry['file_size']
+        except OSError:
+            return False
+
+    def _save(self):
+        """Write the index atomically (caller holds the lock)"""
+        if not self.index_path:
+            return
+
+        tmp_path = f'{self.index_path}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.error(f"Could not write artifact index {self.index_path}: {e}")
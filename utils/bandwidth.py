@@ -0,0 +1,72 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+class BandwidthScheduler:
+    """Shares one process-wide download budget evenly between active transfers"""
+
+    def __init__(self, total_rate=0, concurrent_fragments=1):
+        self.total_rate = total_rate  # bytes per second, 0 for unlimited
+        self.concurrent_fragments = concurrent_fragments
+        self._active = {}  # keyed by id(), since params dicts compare by value
+        self._lock = threading.Lock()
+
+    def configure(self, total_rate=None, concurrent_fragments=None):
+        with self._lock:
+            if total_rate is not None:
+                self.total_rate = total_rate
+            if concurrent_fragments is not None:
+                self.concurrent_fragments = concurrent_fragments
+            self._rebalance()
+
+    @contextmanager
+    def lease(self, ydl_params):
+        """
+        Register a transfer for the duration of the block
+
+        yt-dlp reads 'ratelimit' from the YoutubeDL params while it downloads,
+        so changing the dict in place re-divides the budget for transfers
+        that are already running whenever one starts or finishes.
+
+        Args:
+            ydl_params (dict): The params dict of the YoutubeDL doing the transfer
+        """
+        with self._lock:
+            ydl_params['concurrent_fragment_downloads'] = self.concurrent_fragments
+            self._active[id(ydl_params)] = ydl_params
+            self._rebalance()
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._active[id(ydl_params)]
+                self._rebalance()
+
+    def current_share(self):
+        """Bytes per second each active transfer may use, None if unlimited"""
+        with self._lock:
+            return self._share()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'total_rate': self.total_rate,
+                'active_transfers': len(self._active),
+                'per_transfer_rate': self._share(),
+                'concurrent_fragments': self.concurrent_fragments
+            }
+
+    def _share(self):
+        if not self.total_rate:
+            return None
+        return max(self.total_rate // max(len(self._active), 1), 1)
+
+    def _rebalance(self):
+        """Give every active transfer an equal slice (caller holds the lock)"""
+        share = self._share()
+        for params in self._active.values():
+            params['ratelimit'] = share
+        if self._active:
+            logger.debug(f"Bandwidth share: {share} B/s across {len(self._active)} transfers")
@@ -1,11 +1,116 @@
 import yt_dlp
+import copy
 import os
 import logging
 import random
+import re
+import time
+from concurrent.futures import Future
+
+from .artifact_cache import ArtifactCache
+from .bandwidth import BandwidthScheduler
+from .metadata_cache import MetadataCache
+from .metrics import STAGE_SECONDS, DOWNLOAD_ATTEMPTS, DOWNLOADS
+from .method_stats import MethodStats
+from .storage_evictor import StorageEvictor
+from .storage_index import StorageIndex
+from .transcoder import TranscodePool
+from .video_processor import VideoProcessor
 
 logger = logging.getLogger(__name__)
 
+# Extracted metadata shared by previews and downloads, keyed by canonical video ID
+metadata_cache = MetadataCache()
+
+# Finished files keyed by (platform, video ID, media type, quality)
+artifact_cache = ArtifactCache()
+
+# Process-wide download budget and fragment concurrency shared by all transfers
+bandwidth = BandwidthScheduler()
+
+# Outcome and latency of each fallback method, used to order the chain
+method_stats = MethodStats()
+
+# Files in the downloads directory with running totals for the stats endpoints
+storage_index = StorageIndex()
+
+# Least-recently-used eviction that keeps the downloads directory under its disk budget
+storage_evictor = StorageEvictor(storage_index)
+
+# MP3 encodes, run apart from the download workers and limited to the CPU count
+transcoder = TranscodePool()
+
+# yt-dlp error fragments, checked in order, mapped to an error class
+ERROR_PATTERNS = [
+    ('blocked', ['not a bot', 'HTTP Error 429', 'Too Many Requests']),
+    ('private', ['Private video']),
+    ('unavailable', ['Video unavailable', 'has been removed', 'no longer available']),
+    ('age_restricted', ['Sign in to confirm', 'age-restricted', 'age restricted', 'inappropriate for some users']),
+    ('unsupported', ['Unsupported URL']),
+    ('no_formats', ['No video formats found']),
+    ('format', ['Requested format is not available', 'format not available']),
+    ('ffmpeg', ['ffmpeg', 'ffprobe']),
+    ('network', ['timed out', 'Connection reset', 'Connection refused', 'HTTP Error', 'Unable to download', 'IncompleteRead']),
+]
+
+# Audio qualities that keep the source stream and only change the container:
+# quality -> (preferred format, FFmpegExtractAudio codec)
+PASSTHROUGH_AUDIO = {
+    'm4a': ('bestaudio[acodec^=mp4a]/bestaudio[ext=m4a]', 'm4a'),
+    'opus': ('bestaudio[acodec=opus]', 'opus'),
+}
+
+# Platform -> MP3 quality -> LAME bitrate in kbps, as each download path maps them
+MP3_BITRATES = {
+    'youtube': {'best': '320', '192k': '192', '128k': '128', '64k': '64'},
+    # Instagram audio is low-bitrate AAC, so 'best' stops at 192k
+    'instagram': {'best': '192', '192k': '192', '128k': '128', '64k': '64'},
+}
+
+# Errors that no other download method can get around
+TERMINAL_ERRORS = {'private', 'unavailable', 'age_restricted', 'unsupported', 'no_formats'}
+
+FRIENDLY_ERRORS = {
+    'private': 'This video is private and cannot be downloaded.',
+    'unavailable': 'This video is unavailable. It may have been removed or made private.',
+    'age_restricted': 'This video is age-restricted and cannot be downloaded.',
+    'unsupported': 'This URL is not supported. Please check if it\'s a valid YouTube or Instagram URL.',
+    'no_formats': 'No downloadable content found at this URL.',
+}
+
 class VideoDownloader:
+    @staticmethod
+    def classify_error(message):
+        """Map a yt-dlp error message to an error class such as 'private' or 'network'"""
+        message = str(message or '')
+        lowered = message.lower()
+        for error_class, fragments in ERROR_PATTERNS:
+            if any(fragment.lower() in lowered for fragment in fragments):
+                return error_class
+        return 'unknown'
+    
+    @staticmethod
+    def friendly_error(message, error_class=None):
+        """User-facing message for a yt-dlp error"""
+        error_class = error_class or VideoDownloader.classify_error(message)
+        return FRIENDLY_ERRORS.get(error_class, message)
+    
+    @staticmethod
+    def _error_result(error):
+        """Failed result dict carrying the classified error"""
+        return {'success': False, 'error': str(error), 'error_class': VideoDownloader.classify_error(error)}
+    
+    @staticmethod
+    def output_template(download_dir, quality):
+        """
+        yt-dlp output template naming a file after its video and rendition
+        
+        The artifact cache keys files by video and quality, so two qualities
+        of one title must never share a name: 'Title [id].720p.mp4'.
+        """
+        tag = re.sub(r'[^\w-]', '', str(quality or '')) or 'best'
+        return f'{download_dir}/%(title)s [%(id)s].{tag}.%(ext)s'
+    
     @staticmethod
     def get_ydl_opts(media_type, download_dir='downloads', quality='best'):
         """Get yt-dlp options with enhanced configuration and quality support"""
@@ -33,17 +138,18 @@ class VideoDownloader:
         }
         
         base_opts = {
-            'outtmpl': f'{download_dir}/%(title)s.%(ext)s',
+            'outtmpl': VideoDownloader.output_template(download_dir, quality),
             'quiet': False,
             'no_warnings': False,
             'verbose': True,
             'http_headers': common_headers,
-            # Throttle to avoid rate limiting
-            'ratelimit': 5000000,  # 5 MB/s
+            # Throttling is set per transfer by the bandwidth scheduler
             'retries': 10,
             'fragment_retries': 10,
             'skip_unavailable_fragments': True,
             'continue_dl': True,
+            # watch?v=X&list=Y downloads video X, as its canonical key says
+            'noplaylist': True,
             # YouTube specific
             'youtube_include_dash_manifest': False,
             'youtube_include_hls_manifest': False,
@@ -93,89 +199,320 @@ class VideoDownloader:
     def get_video_info(url):
         """Get video information for preview including available formats"""
         try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
+            info = VideoDownloader._extract_info(url)
+            
+            # Extract available formats
+            video_formats = []
+            audio_formats = []
+            
+            if 'formats' in info:
+                for fmt in info['formats']:
+                    format_info = {
+                        'format_id': fmt.get('format_id', 'unknown'),
+                        'ext': fmt.get('ext', 'unknown'),
+                        'quality': fmt.get('format_note', 'unknown'),
+                        'filesize': fmt.get('filesize'),
+                        'vcodec': fmt.get('vcodec', 'none'),
+                        'acodec': fmt.get('acodec', 'none'),
+                        'height': fmt.get('height'),
+                        'width': fmt.get('width'),
+                        'fps': fmt.get('fps')
+                    }
+                    
+                    # Categorize as video or audio
+                    if fmt.get('vcodec') != 'none' and fmt.get('acodec') != 'none':
+                        video_formats.append(format_info)
+                    elif fmt.get('acodec') != 'none' and fmt.get('vcodec') == 'none':
+                        audio_formats.append(format_info)
+            
+            return {
+                'title': info.get('title', 'Unknown Title'),
+                'thumbnail': info.get('thumbnail', ''),
+                'duration': info.get('duration', 0),
+                'uploader': info.get('uploader', 'Unknown'),
+                'view_count': info.get('view_count', 0),
+                'video_formats': video_formats,
+                'audio_formats': audio_formats,
+                'success': True
             }
+        except Exception as e:
+            logger.error(f"Error getting video info: {e}")
+            return VideoDownloader._error_result(e)
+    
+    @staticmethod
+    def _extract_info(url):
+        """Extract video metadata once and share it between previews and downloads"""
+        # youtu.be/X, watch?v=X&t=10 and shorts/X all share one entry
+        cache_key = VideoProcessor.get_canonical_key(url)
+        if cache_key:
+            cached = metadata_cache.get(cache_key)
+            if cached:
+                logger.info(f"Metadata cache hit for {cache_key}")
+                return cached
+        
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': False,
+            'noplaylist': True,
+        }
+        
+        with STAGE_SECONDS.time(stage='extraction'), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # Keep the private keys: dropping them also drops a playlist's (carousel's) entries
+            info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+        
+        if cache_key:
+            metadata_cache.set(cache_key, info)
+        return info
+    
+    @staticmethod
+    def get_playlist_entries(url, limit=200):
+        """
+        Resolve a playlist to its videos with one flat extraction
+        
+        Flat extraction reads the playlist page only, so it costs one request
+        however long the playlist is; each video is extracted when it is downloaded.
+        
+        Args:
+            url (str): Playlist URL
+            limit (int): Most entries to return
             
+        Returns:
+            dict: 'title' and 'entries' (dicts with 'url' and 'title') on success
+        """
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+            'playlistend': limit,
+        }
+        
+        try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=False)
-                
-                # Extract available formats
-                video_formats = []
-                audio_formats = []
-                
-                if 'formats' in info:
-                    for fmt in info['formats']:
-                        format_info = {
-                            'format_id': fmt.get('format_id', 'unknown'),
-                            'ext': fmt.get('ext', 'unknown'),
-                            'quality': fmt.get('format_note', 'unknown'),
-                            'filesize': fmt.get('filesize'),
-                            'vcodec': fmt.get('vcodec', 'none'),
-                            'acodec': fmt.get('acodec', 'none'),
-                            'height': fmt.get('height'),
-                            'width': fmt.get('width'),
-                            'fps': fmt.get('fps')
-                        }
-                        
-                        # Categorize as video or audio
-                        if fmt.get('vcodec') != 'none' and fmt.get('acodec') != 'none':
-                            video_formats.append(format_info)
-                        elif fmt.get('acodec') != 'none' and fmt.get('vcodec') == 'none':
-                            audio_formats.append(format_info)
-                
-                return {
-                    'title': info.get('title', 'Unknown Title'),
-                    'thumbnail': info.get('thumbnail', ''),
-                    'duration': info.get('duration', 0),
-                    'uploader': info.get('uploader', 'Unknown'),
-                    'view_count': info.get('view_count', 0),
-                    'video_formats': video_formats,
-                    'audio_formats': audio_formats,
-                    'success': True
-                }
+            
+            entries = []
+            for entry in info.get('entries') or []:
+                if not entry or not entry.get('id'):
+                    continue
+                entry_url = entry.get('url') or entry['id']
+                if not entry_url.startswith(('http://', 'https://')):
+                    entry_url = f"https://www.youtube.com/watch?v={entry['id']}"
+                entries.append({'url': entry_url, 'title': entry.get('title') or entry['id']})
+            
+            logger.info(f"Resolved {len(entries)} playlist entries from {url}")
+            return {'success': True, 'title': info.get('title', ''), 'entries': entries[:limit]}
         except Exception as e:
-            logger.error(f"Error getting video info: {e}")
-            return {'success': False, 'error': str(e)}
+            logger.error(f"Error resolving playlist: {e}")
+            return VideoDownloader._error_result(e)
     
     @staticmethod
-    def download_media(url, media_type, platform, quality='best'):
-        """Download media with specified quality and return file path"""
+    def _try_extract_info(url):
+        """
+        Shared extraction for the download path
+        
+        Returns:
+            tuple: (info, error) - info is None when extraction failed, which
+            lets each method extract on its own unless the error is terminal
+        """
+        try:
+            return VideoDownloader._extract_info(url), None
+        except Exception as e:
+            logger.warning(f"Shared extraction failed: {e}")
+            return None, VideoDownloader._error_result(e)
+    
+    @staticmethod
+    def _download_with_info(ydl, url, info=None):
+        """Download from already-extracted metadata, extracting only when none is available"""
+        with bandwidth.lease(ydl.params):
+            # Merges and remuxes run inside the download call; time them apart from the transfer
+            postprocess = {'seconds': 0.0, 'started': None}
+            
+            def on_postprocess(d):
+                if d.get('status') == 'started':
+                    postprocess['started'] = time.monotonic()
+                elif d.get('status') == 'finished' and postprocess['started'] is not None:
+                    postprocess['seconds'] += time.monotonic() - postprocess['started']
+                    postprocess['started'] = None
+            
+            ydl.add_postprocessor_hook(on_postprocess)
+            started = time.monotonic()
+            try:
+                if info:
+                    # yt-dlp mutates what it is given, so the shared dict is never handed over
+                    return ydl.process_ie_result(copy.deepcopy(info), download=True)
+                return ydl.extract_info(url, download=True)
+            finally:
+                STAGE_SECONDS.observe(time.monotonic() - started - postprocess['seconds'], stage='transfer')
+                if postprocess['seconds']:
+                    STAGE_SECONDS.observe(postprocess['seconds'], stage='postprocess')
+    
+    @staticmethod
+    def download_media(url, media_type, platform, quality='best', progress_callback=None):
+        """
+        Download media with specified quality and return file path
+
+        progress_callback, if given, receives dicts with the current stage
+        ('downloading', 'finished', 'postprocessing'), bytes downloaded,
+        total bytes, speed and ETA as yt-dlp reports them.
+        """
         try:
             logger.info(f"Starting download - URL: {url}, Type: {media_type}, Platform: {platform}, Quality: {quality}")
             
+            # Serve repeat requests for the same rendition from disk
+            canonical_key = VideoProcessor.get_canonical_key(url, platform)
+            cache_key = ArtifactCache.make_key(canonical_key, media_type, quality) if canonical_key else None
+            if cache_key:
+                cached = artifact_cache.get(cache_key)
+                if cached:
+                    logger.info(f"Artifact cache hit for {cache_key}: {cached['filename']}")
+                    storage_index.touch(cached['filename'])
+                    DOWNLOADS.inc(platform=platform, outcome='cached', error_class='none')
+                    return {**cached, 'success': True, 'cached': True}
+            
             if platform == 'youtube':
-                return VideoDownloader._download_youtube_enhanced(url, media_type, quality)
+                result = VideoDownloader._download_youtube_enhanced(url, media_type, quality, progress_callback)
             elif platform == 'instagram':
-                return VideoDownloader._download_instagram(url, media_type, quality)
+                result = VideoDownloader._download_instagram(url, media_type, quality, progress_callback)
+                VideoDownloader._count_result(DOWNLOAD_ATTEMPTS, result, platform=platform, method='instagram')
             else:
                 return {'success': False, 'error': f'Unsupported platform: {platform}'}
+            
+            if result.get('success') and result.get('transcode_bitrate'):
+                # The encode waits for a CPU in the transcode pool while this worker moves on
+                finished = VideoDownloader._transcode(result, platform, canonical_key, quality, progress_callback)
+                finished.add_done_callback(lambda f: VideoDownloader._count_result(
+                    DOWNLOADS, VideoDownloader._error_result(f.exception()) if f.exception() else f.result(), platform=platform))
+                return finished
+            if result.get('success'):
+                VideoDownloader._store_result(result, cache_key)
+            VideoDownloader._count_result(DOWNLOADS, result, platform=platform)
+            return result
         except Exception as e:
             logger.error(f"Download error: {e}")
-            return {'success': False, 'error': str(e)}
+            result = VideoDownloader._error_result(e)
+            VideoDownloader._count_result(DOWNLOADS, result, platform=platform)
+            return result
+    
+    @staticmethod
+    def _count_result(counter, result, **labels):
+        """Count a download or method attempt under its outcome and error class"""
+        if result.get('success'):
+            counter.inc(outcome='success', error_class='none', **labels)
+        else:
+            counter.inc(outcome='failure', error_class=result.get('error_class') or 'unknown', **labels)
+    
+    @staticmethod
+    def _store_result(result, cache_key=None):
+        """Index a finished file and remember it for repeat requests"""
+        result.setdefault('file_size', VideoDownloader._file_size(result['filename']))
+        storage_index.add(result['filename'])
+        if cache_key:
+            artifact_cache.put(cache_key, result)
+        storage_evictor.wake()
+    
+    @staticmethod
+    def _transcode(result, platform, canonical_key=None, quality=None, progress_callback=None):
+        """
+        Hand a downloaded source to the transcode pool
+        
+        With an MP3 ladder configured, the other qualities are encoded from
+        the same decode and cached, so later requests for them need neither
+        a download nor an encode.
+        
+        Returns:
+            Future: Resolves to the download result once the MP3 is written
+        """
+        source_path = os.path.join('downloads', result.pop('filename'))
+        bitrate = result.pop('transcode_bitrate')
+        # 'Title [id].best.webm' encodes to 'Title [id].320k.mp3', named by bitrate
+        output_base = os.path.splitext(os.path.splitext(source_path)[0])[0]
+        cache_key = ArtifactCache.make_key(canonical_key, 'mp3', quality) if canonical_key else None
+        
+        ladder = {}  # bitrate -> quality
+        if canonical_key:
+            # Same mapping as a direct request, so a ladder-cached rendition matches it
+            bitrates = MP3_BITRATES.get(platform, {})
+            for ladder_quality in transcoder.mp3_ladder:
+                ladder_bitrate = bitrates.get(ladder_quality)
+                if (ladder_bitrate and ladder_quality != quality and ladder_bitrate != bitrate
+                        and not artifact_cache.contains(ArtifactCache.make_key(canonical_key, 'mp3', ladder_quality))):
+                    ladder[ladder_bitrate] = ladder_quality
+        finished = Future()
+        
+        # The source may wait in the queue longer than the evictor's idle window
+        if not storage_index.pin(source_path):
+            finished.set_result({'success': False, 'error': 'The downloaded audio was removed before it could be encoded. Please try again.',
+                                 'error_class': 'unknown'})
+            return finished
+        
+        def on_encoded(encode):
+            storage_index.unpin(source_path)
+            try:
+                encoded = encode.result()
+                if encoded['success']:
+                    done = {**result, 'filename': os.path.basename(encoded['filepath'])}
+                    VideoDownloader._store_result(done, cache_key)
+                    for extra_bitrate, extra_path in encoded.get('extra_outputs', {}).items():
+                        extra = {**result, 'filename': os.path.basename(extra_path)}
+                        VideoDownloader._store_result(extra, ArtifactCache.make_key(canonical_key, 'mp3', ladder[extra_bitrate]))
+                else:
+                    done = encoded
+            except Exception as e:
+                logger.error(f"Transcode error: {e}")
+                done = VideoDownloader._error_result(e)
+            finished.set_result(done)
+        
+        try:
+            encode = transcoder.submit_mp3(source_path, bitrate, progress_callback, extra_bitrates=ladder,
+                                           output_base=output_base)
+        except Exception:
+            storage_index.unpin(source_path)
+            raise
+        encode.add_done_callback(on_encoded)
+        return finished
     
     @staticmethod
-    def _download_youtube_enhanced(url, media_type, quality):
+    def _download_youtube_enhanced(url, media_type, quality, progress_callback=None):
         """Enhanced YouTube download with multiple fallback methods and quality support"""
         download_dir = 'downloads'
         os.makedirs(download_dir, exist_ok=True)
         
-        # Try method 1: Standard download with quality
-        result = VideoDownloader._try_download_method_1(url, media_type, download_dir, quality)
-        if result.get('success'):
-            return result
+        # Extract once and reuse the metadata for every fallback method
+        info, error = VideoDownloader._try_extract_info(url)
+        if error and error['error_class'] in TERMINAL_ERRORS:
+            error['error'] = VideoDownloader.friendly_error(error['error'], error['error_class'])
+            return error
         
-        # Try method 2: Alternative format selection
-        result = VideoDownloader._try_download_method_2(url, media_type, download_dir, quality)
-        if result.get('success'):
-            return result
+        # 1: standard download with quality, 2: alternative format selection,
+        # 3: simple format - tried in order of observed success rate
+        methods = {
+            1: VideoDownloader._try_download_method_1,
+            2: VideoDownloader._try_download_method_2,
+            3: VideoDownloader._try_download_method_3,
+        }
         
-        # Try method 3: Simple format
-        result = VideoDownloader._try_download_method_3(url, media_type, download_dir, quality)
-        if result.get('success'):
-            return result
+        for number in method_stats.order(list(methods)):
+            started = time.monotonic()
+            result = methods[number](url, media_type, download_dir, quality, progress_callback, info)
+            error_class = result.get('error_class')
+            terminal = error_class in TERMINAL_ERRORS
+            method_stats.record(number, result.get('success'), time.monotonic() - started,
+                                error_class, counts_against=not terminal)
+            VideoDownloader._count_result(DOWNLOAD_ATTEMPTS, result, platform='youtube', method=number)
+            
+            if result.get('success'):
+                result['method'] = number
+                return result
+            
+            # Private, removed or age-gated videos fail the same way for every method
+            if terminal:
+                logger.info(f"Method {number} hit a terminal error ({error_class}), skipping remaining methods")
+                result['error'] = VideoDownloader.friendly_error(result['error'], error_class)
+                return result
+        
+        # The shared metadata may hold expired stream URLs; re-extract next time
+        metadata_cache.invalidate(VideoProcessor.get_canonical_key(url))
         
         return {
             'success': False, 
@@ -183,29 +520,33 @@ class VideoDownloader:
         }
     
     @staticmethod
-    def _try_download_method_1(url, media_type, download_dir, quality):
+    def _try_download_method_1(url, media_type, download_dir, quality, progress_callback=None, info=None):
         """Method 1: Standard download with quality support"""
         try:
             ydl_opts = VideoDownloader.get_ydl_opts(media_type, download_dir, quality)
+            if media_type == 'mp3':
+                VideoDownloader._apply_audio_passthrough(ydl_opts, quality)
+            transcode_bitrate = VideoDownloader._defer_audio_extraction(ydl_opts)
+            VideoDownloader._add_progress_hooks(ydl_opts, progress_callback)
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                logger.info(f"Method 1 - Extracting: {info.get('title', 'Unknown')} with quality: {quality}")
-                ydl.download([url])
+                logger.info(f"Method 1 - Downloading: {(info or {}).get('title', url)} with quality: {quality}")
+                info = VideoDownloader._download_with_info(ydl, url, info)
                 
                 filename = VideoDownloader._get_final_filename(ydl, info, media_type, download_dir)
                 return {
                     'filename': os.path.basename(filename),
                     'title': info.get('title', 'Unknown'),
                     'thumbnail': info.get('thumbnail', ''),
+                    'transcode_bitrate': transcode_bitrate,
                     'success': True
                 }
         except Exception as e:
             logger.warning(f"Method 1 failed: {e}")
-            return {'success': False}
+            return VideoDownloader._error_result(e)
     
     @staticmethod
-    def _try_download_method_2(url, media_type, download_dir, quality):
+    def _try_download_method_2(url, media_type, download_dir, quality, progress_callback=None, info=None):
         """Method 2: Alternative format selection with quality"""
         try:
             if media_type == 'mp4':
@@ -232,7 +573,7 @@ class VideoDownloader:
             
             ydl_opts = {
                 'format': format_spec,
-                'outtmpl': f'{download_dir}/%(title)s.%(ext)s',
+                'outtmpl': VideoDownloader.output_template(download_dir, quality),
                 'quiet': False,
                 'no_warnings': False,
                 'http_headers': {
@@ -252,27 +593,31 @@ class VideoDownloader:
                     'preferredcodec': 'mp3',
                     'preferredquality': audio_quality,
                 }]
+                VideoDownloader._apply_audio_passthrough(ydl_opts, quality)
             elif media_type == 'mp4':
                 ydl_opts['merge_output_format'] = 'mp4'
             
+            transcode_bitrate = VideoDownloader._defer_audio_extraction(ydl_opts)
+            VideoDownloader._add_progress_hooks(ydl_opts, progress_callback)
+            
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                logger.info(f"Method 2 - Extracting: {info.get('title', 'Unknown')} with quality: {quality}")
-                ydl.download([url])
+                logger.info(f"Method 2 - Downloading: {(info or {}).get('title', url)} with quality: {quality}")
+                info = VideoDownloader._download_with_info(ydl, url, info)
                 
                 filename = VideoDownloader._get_final_filename(ydl, info, media_type, download_dir)
                 return {
                     'filename': os.path.basename(filename),
                     'title': info.get('title', 'Unknown'),
                     'thumbnail': info.get('thumbnail', ''),
+                    'transcode_bitrate': transcode_bitrate,
                     'success': True
                 }
         except Exception as e:
             logger.warning(f"Method 2 failed: {e}")
-            return {'success': False}
+            return VideoDownloader._error_result(e)
     
     @staticmethod
-    def _try_download_method_3(url, media_type, download_dir, quality):
+    def _try_download_method_3(url, media_type, download_dir, quality, progress_callback=None, info=None):
         """Method 3: Simple format for maximum compatibility with quality"""
         try:
             # Simplest possible format selection with quality consideration
@@ -283,7 +628,7 @@ class VideoDownloader:
             
             ydl_opts = {
                 'format': format_spec,
-                'outtmpl': f'{download_dir}/%(title)s.%(ext)s',
+                'outtmpl': VideoDownloader.output_template(download_dir, quality),
                 'quiet': False,
                 'no_warnings': False,
                 'http_headers': {
@@ -307,34 +652,117 @@ class VideoDownloader:
                     'preferredcodec': 'mp3',
                     'preferredquality': audio_quality,
                 }]
+                VideoDownloader._apply_audio_passthrough(ydl_opts, quality)
+            
+            transcode_bitrate = VideoDownloader._defer_audio_extraction(ydl_opts)
+            VideoDownloader._add_progress_hooks(ydl_opts, progress_callback)
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                logger.info(f"Method 3 - Extracting: {info.get('title', 'Unknown')} with quality: {quality}")
-                ydl.download([url])
+                logger.info(f"Method 3 - Downloading: {(info or {}).get('title', url)} with quality: {quality}")
+                info = VideoDownloader._download_with_info(ydl, url, info)
                 
                 filename = VideoDownloader._get_final_filename(ydl, info, media_type, download_dir)
                 return {
                     'filename': os.path.basename(filename),
                     'title': info.get('title', 'Unknown'),
                     'thumbnail': info.get('thumbnail', ''),
+                    'transcode_bitrate': transcode_bitrate,
                     'success': True
                 }
         except Exception as e:
             logger.warning(f"Method 3 failed: {e}")
-            return {'success': False}
+            return VideoDownloader._error_result(e)
+    
+    @staticmethod
+    def _file_size(filename, download_dir='downloads'):
+        """Size in bytes of a downloaded file, 0 if it cannot be read"""
+        try:
+            return os.path.getsize(os.path.join(download_dir, filename))
+        except OSError:
+            return 0
+    
+    @staticmethod
+    def _apply_audio_passthrough(ydl_opts, quality):
+        """
+        Keep the source audio for the 'm4a' and 'opus' qualities instead of encoding MP3
+        
+        FFmpegExtractAudio copies the stream when it already has the preferred
+        codec, so only the container changes (AAC into m4a, Opus into Ogg).
+        Sources without such a stream fall back to the best audio and are converted.
+        """
+        passthrough = PASSTHROUGH_AUDIO.get(quality)
+        if not passthrough:
+            return ydl_opts
+        
+        format_spec, codec = passthrough
+        ydl_opts['format'] = f'{format_spec}/bestaudio/best'
+        ydl_opts['postprocessors'] = [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': codec,
+        }]
+        return ydl_opts
+    
+    @staticmethod
+    def _defer_audio_extraction(ydl_opts):
+        """
+        Take the MP3 encode out of yt-dlp's postprocessors so the transcode pool runs it
+        
+        Returns:
+            str: Bitrate the encode should use, or None for downloads that need no encode
+        """
+        bitrate = None
+        postprocessors = []
+        for postprocessor in ydl_opts.get('postprocessors', []):
+            # Passthrough remuxes are cheap and stay in the download worker
+            if postprocessor.get('key') == 'FFmpegExtractAudio' and postprocessor.get('preferredcodec') == 'mp3':
+                bitrate = postprocessor.get('preferredquality')
+            else:
+                postprocessors.append(postprocessor)
+        ydl_opts['postprocessors'] = postprocessors
+        return bitrate
+    
+    @staticmethod
+    def _add_progress_hooks(ydl_opts, progress_callback):
+        """Forward yt-dlp download and postprocessor progress to the callback"""
+        if not progress_callback:
+            return ydl_opts
+        
+        def on_download(d):
+            progress_callback({
+                'stage': d.get('status', 'downloading'),
+                'downloaded_bytes': d.get('downloaded_bytes'),
+                'total_bytes': d.get('total_bytes') or d.get('total_bytes_estimate'),
+                'speed': d.get('speed'),
+                'eta': d.get('eta')
+            })
+        
+        def on_postprocess(d):
+            progress_callback({
+                'stage': 'postprocessing',
+                'postprocessor': d.get('postprocessor'),
+                'status': d.get('status')
+            })
+        
+        ydl_opts['progress_hooks'] = [on_download]
+        ydl_opts['postprocessor_hooks'] = [on_postprocess]
+        return ydl_opts
     
     @staticmethod
     def _get_final_filename(ydl, info, media_type, download_dir):
         """Get the final filename after download"""
+        # yt-dlp records the path left behind by merging/postprocessing
+        for download in info.get('requested_downloads') or []:
+            if download.get('filepath') and os.path.exists(download['filepath']):
+                return download['filepath']
+        
         filename = ydl.prepare_filename(info)
         
         if media_type == 'mp3':
-            # For MP3, look for the converted file
+            # For MP3, look for the converted file (or the remuxed m4a/opus)
             base_name = os.path.splitext(filename)[0]
-            expected_mp3 = base_name + '.mp3'
-            if os.path.exists(expected_mp3):
-                return expected_mp3
+            for ext in ('.mp3', '.m4a', '.opus'):
+                if os.path.exists(base_name + ext):
+                    return base_name + ext
             # Fallback to original filename if conversion didn't happen
             return filename
         elif media_type == 'mp4':
@@ -349,7 +777,7 @@ class VideoDownloader:
         return filename
     
     @staticmethod
-    def _download_instagram(url, media_type, quality='best'):
+    def _download_instagram(url, media_type, quality='best', progress_callback=None):
         """Download from Instagram with quality support"""
         download_dir = 'downloads'
         os.makedirs(download_dir, exist_ok=True)
@@ -362,45 +790,45 @@ class VideoDownloader:
         
         ydl_opts = {
             'format': format_spec,
-            'outtmpl': f'{download_dir}/%(title)s.%(ext)s',
+            'outtmpl': VideoDownloader.output_template(download_dir, quality),
             'quiet': False,
             'no_warnings': False,
         }
         
         if media_type == 'mp3':
             # Audio quality for Instagram
-            quality_map = {
-                'best': '192',
-                '192k': '192',
-                '128k': '128',
-                '64k': '64'
-            }
-            audio_quality = quality_map.get(quality, '192')
+            audio_quality = MP3_BITRATES['instagram'].get(quality, '192')
             
             ydl_opts['postprocessors'] = [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
                 'preferredquality': audio_quality,
             }]
+            VideoDownloader._apply_audio_passthrough(ydl_opts, quality)
+        
+        transcode_bitrate = VideoDownloader._defer_audio_extraction(ydl_opts)
+        VideoDownloader._add_progress_hooks(ydl_opts, progress_callback)
         
         try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                ydl.download([url])
+                info, error = VideoDownloader._try_extract_info(url)
+                if error and error['error_class'] in TERMINAL_ERRORS:
+                    error['error'] = VideoDownloader.friendly_error(error['error'], error['error_class'])
+                    return error
+                info = VideoDownloader._download_with_info(ydl, url, info)
                 
-                filename = ydl.prepare_filename(info)
-                if media_type == 'mp3':
-                    filename = filename.rsplit('.', 1)[0] + '.mp3'
+                filename = VideoDownloader._get_final_filename(ydl, info, media_type, download_dir)
                 
                 return {
                     'filename': os.path.basename(filename),
                     'title': info.get('title', 'Instagram Media'),
                     'thumbnail': info.get('thumbnail', ''),
+                    'transcode_bitrate': transcode_bitrate,
                     'success': True
                 }
         except Exception as e:
             logger.error(f"Instagram download error: {e}")
-            return {'success': False, 'error': str(e)}
+            return VideoDownloader._error_result(e)
     
     @staticmethod
     def get_quality_options(media_type, platform):
@@ -410,7 +838,9 @@ class VideoDownloader:
                 {'value': 'best', 'label': 'Best Quality (320kbps)'},
                 {'value': '192k', 'label': 'High Quality (192kbps)'},
                 {'value': '128k', 'label': 'Good Quality (128kbps)'},
-                {'value': '64k', 'label': 'Standard Quality (64kbps)'}
+                {'value': '64k', 'label': 'Standard Quality (64kbps)'},
+                {'value': 'm4a', 'label': 'Original AAC (m4a, no re-encoding)'},
+                {'value': 'opus', 'label': 'Original Opus (ogg, no re-encoding)'}
             ]
         else:  # mp4
             if platform == 'youtube':
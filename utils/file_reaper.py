@@ -0,0 +1,93 @@
+import logging
+import os
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+class FileReaper:
+    """Deletes downloaded files in the background once no download record refers to them"""
+
+    def __init__(self, storage_index, retry_seconds=60, max_retries=10):
+        self.storage_index = storage_index
+        self.retry_seconds = retry_seconds
+        self.max_retries = max_retries
+        self.removed = 0
+        self.kept = 0
+        self.deferred = 0
+        self._queue = queue.Queue()
+        self._retries = {}  # filename -> times it was found pinned
+        self._thread = None
+        self._lock = threading.Lock()
+        self._is_referenced = lambda filename: True
+        self._before_remove = None
+
+    def configure(self, is_referenced, before_remove=None):
+        """
+        Set how the reaper decides a file is orphaned
+
+        Args:
+            is_referenced (callable): is_referenced(filename) is True while any record still uses the file
+            before_remove (callable): Called with the filename just before it is deleted
+        """
+        self._is_referenced = is_referenced
+        self._before_remove = before_remove
+
+    def enqueue(self, filenames):
+        """Queue files whose records were deleted; returns immediately"""
+        for filename in filenames:
+            if filename:
+                self._queue.put(os.path.basename(filename))
+        self._ensure_thread()
+
+    def stats(self):
+        return {
+            'pending': self._queue.qsize(),
+            'removed': self.removed,
+            'kept': self.kept,
+            'deferred': self.deferred
+        }
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='file-reaper', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            filename = self._queue.get()
+            try:
+                self._reap(filename)
+            except Exception as e:
+                logger.error(f"Could not reap {filename}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _reap(self, filename):
+        # Files are shared between users through the artifact cache, so only
+        # delete one when the last record pointing at it is gone
+        if self._is_referenced(filename):
+            self._retries.pop(filename, None)
+            self.kept += 1
+            return
+
+        # The storage index refuses files that are being served, reused from the
+        # artifact cache or evicted right now, so none is deleted under a reader
+        if self.storage_index.delete(filename, self._before_remove) is not None:
+            self._retries.pop(filename, None)
+            self.removed += 1
+            logger.info(f"Reaped orphaned file: {filename}")
+            return
+
+        retries = self._retries.get(filename, 0) + 1
+        if retries > self.max_retries:
+            # Still unreferenced, so the evictor removes it once nothing holds it
+            self._retries.pop(filename, None)
+            logger.warning(f"{filename} stayed in use; leaving it to the storage evictor")
+            return
+        self._retries[filename] = retries
+        self.deferred += 1
+        timer = threading.Timer(self.retry_seconds, self._queue.put, [filename])
+        timer.daemon = True
+        timer.start()
@@ -0,0 +1,425 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class DownloadJob:
+    """A single queued download and its current state"""
+
+    def __init__(self, owner, on_result=None, kind='download'):
+        self.id = str(uuid.uuid4())
+        self.owner = owner
+        self.on_result = on_result
+        self.kind = kind  # download, resolver (playlist lookup) or maintenance
+        self.status = 'queued'  # queued, running, completed, failed
+        self.result = None
+        self.error = None
+        self.progress = {'stage': 'queued'}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.followers = []  # identical jobs waiting on this one's download
+        self._version = 0
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def update_progress(self, progress):
+        """Merge a progress report from the downloader and wake up listeners"""
+        progress = dict(progress)
+        downloaded = progress.get('downloaded_bytes')
+        total = progress.get('total_bytes')
+        if downloaded and total:
+            progress['percent'] = round(min(downloaded / total * 100, 100), 1)
+
+        for job in [self, *self.followers]:
+            job.progress = progress
+            job.notify()
+
+    def notify(self):
+        with self._changed:
+            self._version += 1
+            self._changed.notify_all()
+
+    def wait_for_update(self, version, timeout=None):
+        """
+        Block until the job changes past the given version
+
+        Returns:
+            int: The current version, unchanged if the timeout expired
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version, timeout=timeout)
+            return self._version
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+class DownloadBatch:
+    """A group of downloads, such as a playlist, run a few at a time"""
+
+    def __init__(self, owner, title='', max_concurrent=2):
+        self.id = str(uuid.uuid4())
+        self.owner = owner
+        self.title = title
+        self.max_concurrent = max_concurrent
+        self.status = 'resolving'  # resolving, running, completed, failed
+        self.error = None
+        self.items = []
+        self.created_at = time.time()
+        self.finished_at = None
+        self._pending = []
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def fail(self, error):
+        """Give up on the whole batch, e.g. when the playlist could not be resolved"""
+        self.error = error
+        self.status = 'failed'
+        self.finished_at = time.time()
+
+    def to_dict(self):
+        """Aggregate progress across items, each running item counted by its own percent"""
+        with self._lock:
+            items = [dict(item) for item in self.items]
+
+        counts = {'queued': 0, 'running': 0, 'completed': 0, 'failed': 0}
+        progress = 0
+        for item in items:
+            job = item.pop('job', None)
+            if item['status'] == 'queued' and job is not None:
+                item['status'] = 'running' if job.status == 'running' else 'queued'
+            if item['status'] == 'running' and job is not None:
+                item['percent'] = job.progress.get('percent', 0)
+                progress += item['percent']
+            elif item['status'] in ('completed', 'failed'):
+                progress += 100
+            counts[item['status']] += 1
+
+        return {
+            'id': self.id,
+            'title': self.title,
+            'status': self.status,
+            'error': self.error,
+            'total': len(items),
+            'counts': counts,
+            'percent': round(progress / len(items), 1) if items else 0,
+            'items': items,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+class DownloadJobQueue:
+    """Runs download jobs on a bounded pool of worker threads"""
+
+    def __init__(self, max_workers=4, retention_seconds=3600, maintenance_workers=1):
+        self.max_workers = max_workers
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download-worker')
+        # Housekeeping jobs (clearing a history) never take or wait for a download slot
+        self._maintenance_executor = ThreadPoolExecutor(max_workers=maintenance_workers, thread_name_prefix='maintenance-worker')
+        self._jobs = {}
+        self._batches = {}
+        self._inflight = {}  # key -> leader job
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def submit(self, owner, task, on_result=None, key=None, kind='download'):
+        """
+        Queue a download task
+        
+        Jobs submitted with the same key while one is still queued or running
+        attach to that job instead of starting their own download, and all of
+        them receive its result.
+
+        Args:
+            owner (str): ID of the user the job belongs to
+            task (callable): Called with the job, returns a result dict with a 'success' key
+            on_result (callable): Called with (job, result) for every job sharing the
+                result, returns the job's own final result
+            key (str): Identifies identical downloads that may share one run
+            kind (str): 'download', or 'resolver' for tasks that only look up
+                what to download
+
+        Returns:
+            DownloadJob: The queued job
+        """
+        job = DownloadJob(owner, on_result, kind)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+
+            leader = self._inflight.get(key) if key else None
+            if leader is not None:
+                job.status = leader.status
+                job.started_at = leader.started_at
+                job.progress = leader.progress
+                leader.followers.append(job)
+                self.coalesced += 1
+                logger.info(f"Download job {job.id} attached to in-flight job {leader.id}")
+                return job
+
+            if key:
+                self._inflight[key] = job
+
+        self._executor.submit(self._run, job, task, key)
+        logger.info(f"Queued download job {job.id}")
+        return job
+
+    def submit_maintenance(self, owner, task):
+        """
+        Queue a task that is not a download, such as clearing a history
+        
+        It is tracked and polled like any other job but runs on the small
+        maintenance pool, so long transfers never hold it up.
+
+        Args:
+            owner (str): ID of the user the job belongs to
+            task (callable): Called with the job, returns a result dict with a 'success' key
+
+        Returns:
+            DownloadJob: The queued job
+        """
+        job = DownloadJob(owner, kind='maintenance')
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+
+        self._maintenance_executor.submit(self._run, job, task)
+        logger.info(f"Queued maintenance job {job.id}")
+        return job
+
+    def get(self, job_id):
+        """Return the job with the given ID, or None if unknown or expired"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def create_batch(self, owner, title='', max_concurrent=2):
+        """Register an empty batch so its ID can be handed out before its items are known"""
+        batch = DownloadBatch(owner, title, max_concurrent)
+        with self._lock:
+            self._prune()
+            self._batches[batch.id] = batch
+        return batch
+
+    def get_batch(self, batch_id):
+        """Return the batch with the given ID, or None if unknown or expired"""
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def resolve_batch(self, batch, resolve):
+        """
+        Work out a batch's entries on a worker, e.g. by resolving a playlist
+
+        A resolver that raises or returns a failed result fails the batch,
+        so it never stays 'resolving' (and unpruned) forever.
+
+        Args:
+            batch (DownloadBatch): Batch from create_batch
+            resolve (callable): Called with the job; passes the entries to
+                run_batch and returns a result dict with a 'success' key
+
+        Returns:
+            DownloadJob: The queued resolver job
+        """
+        def task(job):
+            try:
+                result = resolve(job) or {'success': False, 'error': 'Could not resolve batch'}
+            except Exception as e:
+                logger.exception(f"Resolving batch {batch.id} crashed")
+                result = {'success': False, 'error': f'Could not resolve batch: {str(e)}'}
+            if not result.get('success') and not batch.finished:
+                batch.fail(result.get('error') or 'Could not resolve batch')
+            return result
+
+        return self.submit(batch.owner, task, kind='resolver')
+
+    def run_batch(self, batch, entries, make_job):
+        """
+        Download a batch's entries, at most batch.max_concurrent at a time
+
+        Each entry becomes a regular job, so identical downloads still share
+        one run. A failed item is recorded and the next one starts.
+
+        Args:
+            batch (DownloadBatch): Batch from create_batch
+            entries (list): Dicts with 'url', optional 'title' and, for
+                entries rejected up front, 'error'
+            make_job (callable): make_job(item) returns a dict with the 'task',
+                'on_result' and 'key' arguments for submit()
+        """
+        with batch._lock:
+            for index, entry in enumerate(entries):
+                item = {
+                    'index': index,
+                    'url': entry['url'],
+                    'title': entry.get('title') or entry['url'],
+                    'status': 'failed' if entry.get('error') else 'queued',
+                    'error': entry.get('error'),
+                    'job_id': None,
+                    'filename': None
+                }
+                batch.items.append(item)
+                if not item['error']:
+                    batch._pending.append(item)
+            batch.status = 'running'
+            starting = min(batch.max_concurrent, len(batch._pending))
+
+        for _ in range(starting):
+            self._start_next(batch, make_job)
+        self._check_batch(batch)
+
+    def _start_next(self, batch, make_job):
+        with batch._lock:
+            if not batch._pending:
+                return
+            item = batch._pending.pop(0)
+
+        try:
+            spec = make_job(item)
+        except Exception as e:
+            logger.exception(f"Could not start batch item {item['url']}")
+            self._finish_item(batch, item, {'success': False, 'error': str(e)})
+            self._start_next(batch, make_job)
+            return
+
+        on_result = spec.get('on_result')
+
+        def finish(job, result):
+            try:
+                if on_result:
+                    result = on_result(job, result) or result
+            except Exception as e:
+                logger.exception(f"Finishing batch item {item['url']} failed")
+                result = {'success': False, 'error': f'Download error: {str(e)}'}
+            self._finish_item(batch, item, result)
+            # A slot is free again
+            self._start_next(batch, make_job)
+            return result
+
+        job = self.submit(batch.owner, spec['task'], on_result=finish, key=spec.get('key'))
+        with batch._lock:
+            item['job_id'] = job.id
+            if item['status'] == 'queued':
+                item['job'] = job
+
+    def _finish_item(self, batch, item, result):
+        with batch._lock:
+            item['status'] = 'completed' if result.get('success') else 'failed'
+            item['error'] = result.get('error')
+            item['filename'] = result.get('filename')
+            item.pop('job', None)
+        self._check_batch(batch)
+
+    def _check_batch(self, batch):
+        with batch._lock:
+            if batch.status == 'running' and all(item['status'] in ('completed', 'failed') for item in batch.items):
+                batch.status = 'completed'
+                batch.finished_at = time.time()
+                logger.info(f"Batch {batch.id} finished")
+
+    def running(self, kind='download'):
+        """Number of running jobs of one kind, e.g. downloads in flight"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == 'running' and job.kind == kind)
+
+    def stats(self):
+        """Count jobs by status"""
+        with self._lock:
+            counts = {'queued': 0, 'running': 0, 'completed': 0, 'failed': 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            counts['coalesced'] = self.coalesced
+            counts['batches'] = sum(1 for batch in self._batches.values() if not batch.finished)
+        counts['max_workers'] = self.max_workers
+        return counts
+
+    def _run(self, job, task, key=None):
+        with self._lock:
+            job.status = 'running'
+            job.started_at = time.time()
+            for follower in job.followers:
+                follower.status = 'running'
+                follower.started_at = job.started_at
+        job.update_progress({'stage': 'starting'})
+
+        try:
+            result = task(job) or {'success': False, 'error': 'Download failed'}
+        except Exception as e:
+            logger.exception(f"Download job {job.id} crashed")
+            result = {'success': False, 'error': f'Download error: {str(e)}'}
+
+        if isinstance(result, Future):
+            # The task handed its last stage to another pool (the transcoder);
+            # free this worker and finish the job when that stage does
+            result.add_done_callback(lambda future: self._complete(job, key, self._future_result(job, future)))
+            return
+
+        self._complete(job, key, result)
+
+    def _future_result(self, job, future):
+        try:
+            return future.result() or {'success': False, 'error': 'Download failed'}
+        except Exception as e:
+            logger.exception(f"Download job {job.id} crashed")
+            return {'success': False, 'error': f'Download error: {str(e)}'}
+
+    def _complete(self, job, key, result):
+        # Close the group first so later submissions start a fresh run
+        with self._lock:
+            if key and self._inflight.get(key) is job:
+                del self._inflight[key]
+            members = [job, *job.followers]
+
+        for member in members:
+            self._finish(member, result)
+
+    def _finish(self, job, result):
+        result = dict(result)
+        if job.on_result:
+            try:
+                result = job.on_result(job, result) or result
+            except Exception as e:
+                logger.exception(f"Finishing download job {job.id} failed")
+                result = {'success': False, 'error': f'Download error: {str(e)}'}
+
+        job.result = result
+        job.error = result.get('error')
+        job.finished_at = time.time()
+        job.status = 'completed' if result.get('success') else 'failed'
+        job.progress = {'stage': job.status}
+        job.notify()
+
+    def _prune(self):
+        """Drop finished jobs older than the retention window (caller holds the lock)"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        expired = [
+            batch_id for batch_id, batch in self._batches.items()
+            if batch.finished and batch.finished_at < cutoff
+        ]
+        for batch_id in expired:
+            del self._batches[batch_id]
@@ -0,0 +1,69 @@
+import threading
+
+class MethodStats:
+    """Success and latency counters for the download fallback methods"""
+
+    def __init__(self):
+        self._methods = {}
+        self._lock = threading.Lock()
+
+    def record(self, method, success, latency, error_class=None, counts_against=True):
+        """
+        Record one attempt of a method
+
+        Args:
+            method (int): Method number
+            success (bool): Whether the download succeeded
+            latency (float): Seconds the attempt took
+            error_class (str): Classified error for failed attempts
+            counts_against (bool): False for failures no method could have avoided
+        """
+        with self._lock:
+            stats = self._methods.setdefault(method, {
+                'calls': 0,
+                'attempts': 0,
+                'successes': 0,
+                'failures': 0,
+                'total_latency': 0.0,
+                'errors': {}
+            })
+            stats['calls'] += 1
+            stats['total_latency'] += latency
+            if success:
+                stats['attempts'] += 1
+                stats['successes'] += 1
+            elif counts_against:
+                stats['attempts'] += 1
+                stats['failures'] += 1
+            if error_class:
+                stats['errors'][error_class] = stats['errors'].get(error_class, 0) + 1
+
+    def order(self, methods):
+        """
+        Order methods by observed success rate, best first
+
+        Rates are smoothed so untried methods keep their default position
+        until there is evidence against them.
+        """
+        with self._lock:
+            def rank(item):
+                position, method = item
+                stats = self._methods.get(method)
+                rate = (stats['successes'] + 1) / (stats['attempts'] + 2) if stats else 0.5
+                return (-rate, position)
+
+            return [method for _, method in sorted(enumerate(methods), key=rank)]
+
+    def stats(self):
+        with self._lock:
+            report = {}
+            for method, stats in self._methods.items():
+                report[method] = {
+                    'attempts': stats['attempts'],
+                    'successes': stats['successes'],
+                    'failures': stats['failures'],
+                    'success_rate': round(stats['successes'] / stats['attempts'] * 100, 1) if stats['attempts'] else 0,
+                    'avg_latency': round(stats['total_latency'] / stats['calls'], 2),
+                    'errors': dict(stats['errors'])
+                }
+            return report
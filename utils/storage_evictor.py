@@ -0,0 +1,125 @@
+import logging
+import shutil
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class StorageEvictor:
+    """Keeps the downloads directory under a disk budget by evicting least recently used files"""
+
+    def __init__(self, storage_index):
+        self.storage_index = storage_index
+        self.max_bytes = 0
+        self.min_free_bytes = 0
+        self.idle_seconds = 300
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.last_run = None
+        self._before_remove = None
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def configure(self, max_bytes=None, min_free_bytes=None, idle_seconds=None, before_remove=None):
+        """
+        Set the disk budget
+
+        Args:
+            max_bytes (int): Largest total size of the downloads directory, 0 for no limit
+            min_free_bytes (int): Free space to keep on the disk, 0 to ignore
+            idle_seconds (int): Files used or written more recently than this are never evicted
+            before_remove (callable): Called with the filename just before it is deleted
+        """
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if min_free_bytes is not None:
+            self.min_free_bytes = min_free_bytes
+        if idle_seconds is not None:
+            self.idle_seconds = idle_seconds
+        if before_remove is not None:
+            self._before_remove = before_remove
+
+    def start(self, interval=60):
+        """Check the budget every interval seconds, or sooner when wake() is called"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='storage-evictor', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Ask for a check now, e.g. after a new file was written"""
+        self._wake.set()
+
+    def evict(self):
+        """
+        Delete least recently used files until the budget is met
+
+        Returns:
+            int: Number of files evicted
+        """
+        over_bytes, short_free = self._overage()
+        if over_bytes <= 0 and short_free <= 0:
+            return 0
+
+        # Evict a little past the limit so one new download does not trigger another pass
+        over_bytes = over_bytes + self.max_bytes // 10 if over_bytes > 0 else 0
+        short_free = short_free + self.min_free_bytes // 10 if short_free > 0 else 0
+
+        evicted = 0
+        freed = 0
+        for filename, _ in self.storage_index.least_recently_used(self.idle_seconds):
+            if freed >= over_bytes and freed >= short_free:
+                break
+            size = self.storage_index.delete(filename, self._before_remove)
+            if size is None:
+                continue
+            evicted += 1
+            freed += size
+            logger.info(f"Evicted {filename} ({size} bytes)")
+
+        self.evicted += evicted
+        self.evicted_bytes += freed
+        if freed < over_bytes or freed < short_free:
+            logger.warning(f"Storage budget still exceeded after evicting {evicted} files; the rest are pinned or in use")
+        return evicted
+
+    def stats(self):
+        return {
+            'max_bytes': self.max_bytes,
+            'min_free_bytes': self.min_free_bytes,
+            'free_bytes': self._free_bytes(),
+            'evicted': self.evicted,
+            'evicted_bytes': self.evicted_bytes,
+            'last_run': self.last_run
+        }
+
+    def _run(self, interval):
+        while True:
+            self._wake.wait(interval)
+            self._wake.clear()
+            try:
+                self.evict()
+            except Exception as e:
+                logger.error(f"Storage eviction failed: {e}")
+            self.last_run = time.time()
+
+    def _overage(self):
+        """Bytes over the size budget and bytes short of the free-space watermark"""
+        over_bytes = 0
+        if self.max_bytes:
+            over_bytes = self.storage_index.stats()['total_size_bytes'] - self.max_bytes
+
+        short_free = 0
+        if self.min_free_bytes:
+            free_bytes = self._free_bytes()
+            if free_bytes is not None:
+                short_free = self.min_free_bytes - free_bytes
+        return over_bytes, short_free
+
+    def _free_bytes(self):
+        try:
+            return shutil.disk_usage(self.storage_index.download_dir).free
+        except OSError:
+            return None
@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from .video_processor import VideoProcessor
+
+logger = logging.getLogger(__name__)
+
+# Files yt-dlp is still writing or has yet to merge; never evicted or cleaned up:
+# name.mp4.part, name.mp4.ytdl, name.mp4.part-Frag3, name.temp.mp4 (postprocessor
+# output) and name.f137.mp4 / name.f251-drc.webm (one format waiting to be merged)
+PARTIAL_FILE = re.compile(r'\.(part|ytdl|temp|tmp)$|\.part-Frag\d+$|\.temp\.\w+$|\.f\d[\w-]*\.\w+(\.part)?$')
+
+class StorageIndex:
+    """In-memory index of the downloads directory with running totals and access times"""
+
+    def __init__(self, download_dir='downloads'):
+        self.download_dir = download_dir
+        self.index_path = None
+        self.last_reconciled = None
+        self.last_drift = 0
+        self._files = {}  # filename -> {'size': bytes, 'ctime': seconds, 'accessed': seconds}
+        self._total_bytes = 0
+        self._file_types = {}
+        self._pins = {}  # filename -> number of readers and writers holding it
+        self._evicting = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self, index_path):
+        """Load the persisted snapshot so totals are available before the first scan"""
+        with self._lock:
+            self.index_path = index_path
+            try:
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                self._replace(snapshot.get('files', {}))
+                self.last_reconciled = snapshot.get('reconciled_at')
+                logger.info(f"Loaded storage index with {len(self._files)} files from {index_path}")
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read storage index {index_path}: {e}")
+
+    def start(self, interval=600):
+        """Reconcile with the directory now and then every interval seconds in the background"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def run():
+            while True:
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.error(f"Storage reconciliation failed: {e}")
+                if self._stop.wait(interval):
+                    return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name='storage-index', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def add(self, filename):
+        """Record a file that was just written"""
+        filename = os.path.basename(filename)
+        try:
+            stat = os.stat(os.path.join(self.download_dir, filename))
+        except OSError:
+            return
+
+        with self._lock:
+            self._put(filename, {'size': stat.st_size, 'ctime': stat.st_ctime, 'accessed': time.time()})
+
+    def remove(self, filename):
+        """Forget a file that was deleted"""
+        with self._lock:
+            self._pop(os.path.basename(filename))
+
+    def touch(self, filename):
+        """Mark a file as just used so it is evicted last"""
+        with self._lock:
+            entry = self._files.get(os.path.basename(filename))
+            if entry:
+                entry['accessed'] = time.time()
+
+    def pin(self, filename):
+        """
+        Protect a file from eviction and cleanup until unpin() is called
+
+        Args:
+            filename (str): File being served or reused
+
+        Returns:
+            bool: False if the file is being deleted right now
+        """
+        filename = os.path.basename(filename)
+        with self._lock:
+            if filename in self._evicting:
+                return False
+            self._pins[filename] = self._pins.get(filename, 0) + 1
+            entry = self._files.get(filename)
+            if entry:
+                entry['accessed'] = time.time()
+            return True
+
+    def unpin(self, filename):
+        filename = os.path.basename(filename)
+        with self._lock:
+            count = self._pins.get(filename, 0) - 1
+            if count > 0:
+                self._pins[filename] = count
+            else:
+                self._pins.pop(filename, None)
+
+    def least_recently_used(self, idle_seconds=0):
+        """
+        Unpinned files ordered from least to most recently used
+
+        Args:
+            idle_seconds (int): Skip files used or written within this many seconds
+
+        Returns:
+            list: (filename, size) tuples
+        """
+        cutoff = time.time() - idle_seconds
+        with self._lock:
+            candidates = [
+                (entry.get('accessed', entry['ctime']), filename, entry['size'])
+                for filename, entry in self._files.items()
+                if self._evictable(filename) and entry.get('accessed', entry['ctime']) <= cutoff
+            ]
+        candidates.sort()
+        return [(filename, size) for _, filename, size in candidates]
+
+    def expired(self, max_age_seconds):
+        """Unpinned files created more than max_age_seconds ago, found without touching the disk"""
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            return [
+                filename for filename, entry in self._files.items()
+                if entry['ctime'] < cutoff and self._evictable(filename)
+            ]
+
+    def delete(self, filename, before_remove=None):
+        """
+        Delete a file unless it is pinned, keeping the index in step
+
+        Args:
+            filename (str): File in the downloads directory
+            before_remove (callable): Called with the filename just before it is deleted
+
+        Returns:
+            int: Bytes freed, or None if the file was pinned or could not be removed
+        """
+        with self._lock:
+            if not self._evictable(filename):
+                return None
+            self._evicting.add(filename)
+            entry = self._files.get(filename)
+
+        try:
+            if before_remove:
+                before_remove(filename)
+            try:
+                os.remove(os.path.join(self.download_dir, filename))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Could not delete {filename}: {e}")
+                return None
+            self.remove(filename)
+            return entry['size'] if entry else 0
+        finally:
+            with self._lock:
+                self._evicting.discard(filename)
+
+    def cleanup(self, max_age_seconds, before_remove=None):
+        """
+        Delete files older than max_age_seconds
+
+        Args:
+            max_age_seconds (int): Maximum age of files in seconds
+            before_remove (callable): Called with each filename before it is deleted
+
+        Returns:
+            int: Number of files removed
+        """
+        removed = 0
+        for filename in self.expired(max_age_seconds):
+            if self.delete(filename, before_remove) is not None:
+                removed += 1
+                logger.info(f"Cleaned up old file: {filename}")
+
+        logger.info(f"Cleanup completed. Removed {removed} files.")
+        return removed
+
+    def reconcile(self):
+        """
+        Rebuild the index from one os.scandir pass over the directory
+
+        Catches files written or deleted behind the index's back (partial
+        downloads, manual cleanup, other processes) and persists a snapshot.
+
+        Returns:
+            int: Number of entries that were added, dropped or resized
+        """
+        started_at = time.time()
+        files = {}
+        if os.path.isdir(self.download_dir):
+            with os.scandir(self.download_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            files[entry.name] = {'size': stat.st_size, 'ctime': stat.st_ctime, 'accessed': stat.st_ctime}
+                    except OSError:
+                        continue
+
+        with self._lock:
+            # Keep files added while the scan was running, and access times the disk does not know about
+            for filename, entry in self._files.items():
+                if filename not in files:
+                    if entry['ctime'] >= started_at:
+                        files[filename] = entry
+                elif 'accessed' in entry:
+                    files[filename]['accessed'] = max(entry['accessed'], files[filename]['ctime'])
+
+            drift = len(files.keys() ^ self._files.keys())
+            drift += sum(
+                1 for name in files.keys() & self._files.keys()
+                if files[name]['size'] != self._files[name]['size']
+            )
+            self._replace(files)
+            self.last_reconciled = time.time()
+            self.last_drift = drift
+            self._save()
+
+        if drift:
+            logger.info(f"Storage index reconciled with {drift} changes")
+        return drift
+
+    def stats(self):
+        """Directory totals in the shape VideoProcessor.get_download_stats returns"""
+        with self._lock:
+            return {
+                'total_files': len(self._files),
+                'total_size': VideoProcessor._bytes_to_human_readable(self._total_bytes),
+                'total_size_bytes': self._total_bytes,
+                'file_types': dict(self._file_types),
+                'directory_exists': os.path.isdir(self.download_dir),
+                'pinned_files': len(self._pins),
+                'last_reconciled': self.last_reconciled,
+                'last_drift': self.last_drift
+            }
+
+    def _evictable(self, filename):
+        """Not pinned, not already being deleted and not still being written (caller holds the lock)"""
+        return (
+            filename not in self._pins
+            and filename not in self._evicting
+            and not PARTIAL_FILE.search(filename)
+        )
+
+    def _put(self, filename, entry):
+        """Add or replace one entry and adjust the totals (caller holds the lock)"""
+        self._pop(filename)
+        self._files[filename] = entry
+        self._total_bytes += entry['size']
+        file_ext = os.path.splitext(filename)[1].lower()
+        self._file_types[file_ext] = self._file_types.get(file_ext, 0) + 1
+
+    def _pop(self, filename):
+        """Remove one entry and adjust the totals (caller holds the lock)"""
+        entry = self._files.pop(filename, None)
+        if entry is None:
+            return
+        self._total_bytes -= entry['size']
+        file_ext = os.path.splitext(filename)[1].lower()
+        self._file_types[file_ext] -= 1
+        if not self._file_types[file_ext]:
+            del self._file_types[file_ext]
+
+    def _replace(self, files):
+        """Swap in a complete set of entries (caller holds the lock)"""
+        self._files = {}
+        self._total_bytes = 0
+        self._file_types = {}
+        for filename, entry in files.items():
+            self._put(filename, entry)
+
+    def _save(self):
+        """Write the snapshot atomically (caller holds the lock)"""
+        if not self.index_path:
+            return
+
+        tmp_path = f'{self.index_path}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'reconciled_at': self.last_reconciled, 'files': self._files}, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.error(f"Could not write storage index {self.index_path}: {e}")
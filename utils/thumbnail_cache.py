@@ -0,0 +1,219 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; thumbnails are then cached at their original size
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Sizes the UI shows thumbnails at, doubled for high-DPI screens (width, height)
+THUMBNAIL_SIZES = {
+    'sm': (240, 180),  # history rows and the preview card (120px wide boxes)
+    'md': (480, 360),
+}
+
+# Thumbnail hosts of the supported platforms; anything else is refused
+ALLOWED_HOSTS = ('ytimg.com', 'youtube.com', 'cdninstagram.com', 'fbcdn.net')
+
+MAX_SOURCE_BYTES = 5 * 1024 * 1024
+
+class ThumbnailCache:
+    """Fetches remote thumbnails, resizes them and keeps them on disk under a byte budget"""
+
+    def __init__(self, cache_dir=os.path.join('instance', 'thumbnails'), max_bytes=100 * 1024 * 1024, max_age=24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._entries = OrderedDict()  # key -> (filename, size, etag, fetched_at), least recently used first
+        self._total_bytes = 0
+        self._fetching = {}  # key -> lock held while one request fetches it
+        self._lock = threading.Lock()
+
+    def configure(self, cache_dir=None, max_bytes=None, max_age=None):
+        """Set the cache directory, budget and refresh age, then index what is already on disk"""
+        with self._lock:
+            if cache_dir:
+                self.cache_dir = cache_dir
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_age is not None:
+                self.max_age = max_age
+            self._load()
+
+    def get(self, url, size='sm'):
+        """
+        Return a local copy of a thumbnail at one of THUMBNAIL_SIZES
+
+        Copies older than max_age are fetched again, since platforms keep a
+        thumbnail's URL when its image changes. Concurrent requests for the
+        same thumbnail wait for a single fetch.
+
+        Args:
+            url (str): Remote thumbnail URL
+            size (str): Key of THUMBNAIL_SIZES
+
+        Returns:
+            tuple: (filepath, etag) where etag is derived from the image bytes,
+            or None if the thumbnail could not be fetched
+        """
+        key = hashlib.sha256(f'{size}:{url}'.encode('utf-8')).hexdigest()
+        cached = self._lookup(key)
+        if cached and not self._expired(cached):
+            return cached[:2]
+
+        with self._lock:
+            fetch_lock = self._fetching.setdefault(key, threading.Lock())
+        with fetch_lock:
+            cached = self._lookup(key, count=False)
+            if cached and not self._expired(cached):
+                return cached[:2]
+
+            with self._lock:
+                self.misses += 1
+            try:
+                data, ext = self._render(self._fetch(url), THUMBNAIL_SIZES[size])
+                return self._store(key, data, ext)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                logger.warning(f"Could not fetch thumbnail {url}: {e}")
+                # An outdated copy beats no thumbnail while the source is unreachable
+                return cached[:2] if cached else None
+            finally:
+                with self._lock:
+                    self._fetching.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors,
+                'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+                'resizing': Image is not None
+            }
+
+    def _lookup(self, key, count=True):
+        """(filepath, etag, fetched_at) of a cached thumbnail, counting a hit while it is fresh"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            filename, _, etag, fetched_at = entry
+            if count and not self._expired(entry):
+                self.hits += 1
+            return os.path.join(self.cache_dir, filename), etag, fetched_at
+
+    def _expired(self, entry):
+        return time.time() - entry[-1] > self.max_age
+
+    @staticmethod
+    def _etag(data):
+        return hashlib.sha256(data).hexdigest()[:32]
+
+    def _fetch(self, url):
+        host = (urlsplit(url).hostname or '').lower()
+        if not any(host == allowed or host.endswith('.' + allowed) for allowed in ALLOWED_HOSTS):
+            raise ValueError(f'host {host} is not a thumbnail host')
+
+        with requests.get(url, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            if not response.headers.get('Content-Type', '').startswith('image/'):
+                raise ValueError(f"not an image ({response.headers.get('Content-Type')})")
+            data = response.raw.read(MAX_SOURCE_BYTES + 1, decode_content=True)
+        if len(data) > MAX_SOURCE_BYTES:
+            raise ValueError('image too large')
+        return data
+
+    @staticmethod
+    def _render(data, dimensions):
+        """Crop and scale to the box the UI fills (object-fit: cover) and re-encode as JPEG"""
+        if Image is None:
+            return data, ThumbnailCache._sniff_extension(data)
+
+        with Image.open(io.BytesIO(data)) as image:
+            thumbnail = ImageOps.fit(image.convert('RGB'), dimensions, Image.LANCZOS)
+        output = io.BytesIO()
+        thumbnail.save(output, 'JPEG', quality=82, optimize=True, progressive=True)
+        return output.getvalue(), '.jpg'
+
+    @staticmethod
+    def _sniff_extension(data):
+        if data.startswith(b'\x89PNG'):
+            return '.png'
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            return '.webp'
+        return '.jpg'
+
+    def _store(self, key, data, ext):
+        """Write the file atomically and evict least recently used thumbnails past the budget"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        filename = key + ext
+        filepath = os.path.join(self.cache_dir, filename)
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
+        etag = self._etag(data)
+
+        with self._lock:
+            # A refreshed thumbnail replaces its old copy, which may have had another extension
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._total_bytes -= previous[1]
+                if previous[0] != filename:
+                    self._remove(previous[0])
+            self._entries[key] = (filename, len(data), etag, time.time())
+            self._total_bytes += len(data)
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (old_filename, old_size, _, _) = self._entries.popitem(last=False)
+                self._total_bytes -= old_size
+                self._remove(old_filename)
+        return filepath, etag
+
+    def _remove(self, filename):
+        try:
+            os.remove(os.path.join(self.cache_dir, filename))
+        except OSError:
+            pass
+
+    def _load(self):
+        """Index files left by earlier runs, oldest first (caller holds the lock)"""
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+        for mtime, filename, size in sorted(files):
+            try:
+                with open(os.path.join(self.cache_dir, filename), 'rb') as f:
+                    etag = self._etag(f.read())
+            except OSError:
+                continue
+            self._entries[os.path.splitext(filename)[0]] = (filename, size, etag, mtime)
+            self._total_bytes += size
+        logger.info(f"Loaded {len(self._entries)} cached thumbnails from {self.cache_dir}")
@@ -0,0 +1,143 @@
+import logging
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class TranscodePool:
+    """Runs ffmpeg encodes on their own bounded pool, sized to the CPU count"""
+
+    def __init__(self, max_workers=None, ffmpeg_path='ffmpeg'):
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.ffmpeg_path = ffmpeg_path
+        self.mp3_ladder = []  # MP3 qualities encoded alongside every MP3 request
+        self.completed = 0
+        self.failed = 0
+        self.encode_seconds = 0.0
+        self.wait_seconds = 0.0
+        self._queued = 0
+        self._running = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def configure(self, max_workers=None, ffmpeg_path=None, mp3_ladder=None):
+        """Set the pool size and ffmpeg binary; takes effect before the first encode"""
+        with self._lock:
+            if max_workers:
+                self.max_workers = max_workers
+            if ffmpeg_path:
+                self.ffmpeg_path = ffmpeg_path
+            if mp3_ladder is not None:
+                self.mp3_ladder = list(mp3_ladder)
+
+    def submit_mp3(self, source_path, bitrate, progress_callback=None, extra_bitrates=(), output_base=None):
+        """
+        Queue an MP3 encode of a downloaded audio or video file
+
+        Each encode is one ffmpeg process, so at most max_workers cores are
+        busy encoding however many downloads finish at once. The source is
+        deleted once the MP3 is written.
+
+        Args:
+            source_path (str): File left by the download
+            bitrate (str): Target bitrate in kbps, e.g. '192'
+            progress_callback (callable): Receives 'encoding' stage updates
+            extra_bitrates (iterable): More bitrates to encode from the same
+                decode, written next to the main file
+            output_base (str): Path every output is named after, as
+                '<output_base>.<bitrate>k.mp3'; defaults to the source path
+                without its extension
+
+        Returns:
+            Future: Resolves to {'success': True, 'filepath': ..., 'extra_outputs':
+            {bitrate: filepath}} or a failed result dict
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='transcoder')
+            self._queued += 1
+
+        if progress_callback:
+            progress_callback({'stage': 'waiting_for_encoder'})
+        output_base = output_base or os.path.splitext(source_path)[0]
+        return self._executor.submit(self._encode_mp3, source_path, bitrate, progress_callback, tuple(extra_bitrates),
+                                     output_base, time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                'max_workers': self.max_workers,
+                'queued': self._queued,
+                'running': self._running,
+                'completed': self.completed,
+                'failed': self.failed,
+                'avg_encode_seconds': round(self.encode_seconds / finished, 2) if finished else 0,
+                'avg_wait_seconds': round(self.wait_seconds / finished, 2) if finished else 0
+            }
+
+    def _encode_mp3(self, source_path, bitrate, progress_callback, extra_bitrates, output_base, queued_at):
+        started = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self.wait_seconds += started - queued_at
+
+        if progress_callback:
+            progress_callback({'stage': 'encoding'})
+
+        # Each bitrate gets its own name, so encoding one never overwrites a file
+        # that the artifact cache or an earlier download already points to
+        target_path = f'{output_base}.{bitrate}k.mp3'
+        outputs = {bitrate: target_path}
+        for extra_bitrate in extra_bitrates:
+            outputs.setdefault(extra_bitrate, f'{output_base}.{extra_bitrate}k.mp3')
+
+        # ffmpeg decodes the input once and feeds one LAME encoder per output.
+        # Outputs are written under a partial name so the storage evictor leaves them alone
+        command = [
+            self.ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-nostdin', '-y',
+            '-i', source_path
+        ]
+        for output_bitrate, output_path in outputs.items():
+            command += ['-vn', '-codec:a', 'libmp3lame', '-b:a', f'{output_bitrate}k', '-f', 'mp3', output_path + '.part']
+
+        success = False
+        try:
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                raise RuntimeError(completed.stderr.strip() or f'ffmpeg exited with {completed.returncode}')
+            for output_path in outputs.values():
+                os.replace(output_path + '.part', output_path)
+            success = True
+            logger.info(f"Encoded {os.path.basename(target_path)} at {', '.join(f'{b}k' for b in outputs)} in {time.monotonic() - started:.1f}s")
+            return {
+                'success': True,
+                'filepath': target_path,
+                'extra_outputs': {b: path for b, path in outputs.items() if b != bitrate}
+            }
+        except Exception as e:
+            logger.error(f"ffmpeg encode of {source_path} failed: {e}")
+            return {'success': False, 'error': f'Audio conversion failed: {e}', 'error_class': 'ffmpeg'}
+        finally:
+            leftovers = [output_path + '.part' for output_path in outputs.values()] + [source_path]
+            for path in leftovers:
+                if path not in outputs.values() and os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        logger.warning(f"Could not remove {path}: {e}")
+            elapsed = time.monotonic() - started
+            STAGE_SECONDS.observe(elapsed, stage='postprocess')
+            with self._lock:
+                self._running -= 1
+                if success:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.encode_seconds += elapsed
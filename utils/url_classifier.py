@@ -0,0 +1,138 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+from urllib.parse import urlsplit, unquote
+
+ClassifiedUrl = namedtuple(
+    'ClassifiedUrl',
+    ['platform', 'kind', 'canonical_id', 'canonical_url', 'start_time', 'playlist_id', 'scheme']
+)
+
+YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com'}
+YOUTU_BE_HOSTS = {'youtu.be', 'www.youtu.be'}
+INSTAGRAM_HOSTS = {'instagram.com', 'www.instagram.com'}
+
+YOUTUBE_ID = re.compile(r'[0-9A-Za-z_-]{11}')
+
+# Only the query parameters we use; parse_qs would decode every one of them
+QUERY_PARAM = re.compile(r'(?:^|[&;])(v|t|start|list)=([^&;]+)')
+
+# One compiled pattern per host family; the named group that matched decides the kind
+YOUTUBE_PATH = re.compile(
+    r'/(?:(?P<watch>watch/?)$'
+    r'|(?P<kind>embed|shorts|live|v)/(?P<id>[0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])'
+    r'|(?P<playlist>playlist/?)$)',
+    re.IGNORECASE
+)
+YOUTU_BE_PATH = re.compile(r'/(?P<id>[0-9A-Za-z_-]{11})(?![0-9A-Za-z_-])')
+INSTAGRAM_PATH = re.compile(
+    r'/(?:(?P<kind>p|reel|tv)/(?P<id>[A-Za-z0-9_-]+)'
+    r'|stories/(?P<username>[A-Za-z0-9_.-]+)(?:/(?P<story_id>[0-9]+))?)',
+    re.IGNORECASE
+)
+
+YOUTUBE_KINDS = {'embed': 'video', 'v': 'video', 'shorts': 'short', 'live': 'live'}
+INSTAGRAM_KINDS = {'p': 'post', 'reel': 'reel', 'tv': 'tv'}
+
+UNKNOWN = ClassifiedUrl('unknown', None, None, None, None, None, '')
+
+class UrlClassifier:
+    """Parses a video URL once into its platform, kind and canonical ID"""
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def classify(url):
+        """
+        Classify a video URL in a single pass
+
+        Results are cached, so the preview and the download of the same URL
+        only parse it once.
+
+        Args:
+            url (str): Video URL, with or without the scheme
+
+        Returns:
+            ClassifiedUrl: platform ('youtube', 'instagram' or 'unknown'),
+            kind ('video', 'short', 'live', 'playlist', 'post', 'reel', 'tv'
+            or 'story'), canonical_id, canonical_url, start_time, playlist_id
+            and the URL's scheme. Fields that do not apply are None.
+        """
+        if not url:
+            return UNKNOWN
+
+        url = url.strip()
+        scheme = ''
+        if '://' in url:
+            scheme = url.split('://', 1)[0].lower()
+        else:
+            url = 'https://' + url
+
+        try:
+            parts = urlsplit(url)
+            host = (parts.hostname or '').lower()
+        except ValueError:
+            return UNKNOWN._replace(scheme=scheme)
+
+        if host in YOUTUBE_HOSTS or host in YOUTU_BE_HOSTS:
+            return UrlClassifier._classify_youtube(parts, host, scheme)
+        if host in INSTAGRAM_HOSTS:
+            return UrlClassifier._classify_instagram(parts, scheme)
+        return UNKNOWN._replace(scheme=scheme)
+
+    @staticmethod
+    def _classify_youtube(parts, host, scheme):
+        query = UrlClassifier._query_params(parts.query)
+        start_time = query.get('t') or query.get('start')
+        playlist_id = query.get('list')
+
+        kind = None
+        video_id = None
+        if host in YOUTU_BE_HOSTS:
+            match = YOUTU_BE_PATH.match(parts.path)
+            if match:
+                kind, video_id = 'video', match.group('id')
+        else:
+            match = YOUTUBE_PATH.match(parts.path)
+            if match and match.group('watch'):
+                candidate = query.get('v', '')
+                if YOUTUBE_ID.fullmatch(candidate):
+                    kind, video_id = 'video', candidate
+            elif match and match.group('kind'):
+                kind, video_id = YOUTUBE_KINDS[match.group('kind').lower()], match.group('id')
+            elif match and match.group('playlist') and playlist_id:
+                kind = 'playlist'
+
+        if video_id:
+            canonical_url = f'https://www.youtube.com/watch?v={video_id}'
+        elif kind == 'playlist':
+            canonical_url = f'https://www.youtube.com/playlist?list={playlist_id}'
+        else:
+            canonical_url = None
+        return ClassifiedUrl('youtube', kind, video_id, canonical_url, start_time, playlist_id, scheme)
+
+    @staticmethod
+    def _query_params(query):
+        """First value of each parameter of interest, like parse_qs(query)[name][0]"""
+        params = {}
+        if query:
+            for match in QUERY_PARAM.finditer(query):
+                value = match.group(2)
+                params.setdefault(match.group(1), unquote(value.replace('+', ' ')) if '%' in value or '+' in value else value)
+        return params
+
+    @staticmethod
+    def _classify_instagram(parts, scheme):
+        match = INSTAGRAM_PATH.match(parts.path)
+        if not match:
+            return ClassifiedUrl('instagram', None, None, None, None, None, scheme)
+
+        if match.group('kind'):
+            kind = INSTAGRAM_KINDS[match.group('kind').lower()]
+            post_id = match.group('id')
+            canonical_url = f'https://www.instagram.com/{match.group("kind").lower()}/{post_id}/'
+        else:
+            kind = 'story'
+            username, story_id = match.group('username'), match.group('story_id')
+            post_id = story_id or username
+            canonical_url = f'https://www.instagram.com/stories/{username}/' + (f'{story_id}/' if story_id else '')
+        return ClassifiedUrl('instagram', kind, post_id, canonical_url, None, None, scheme)
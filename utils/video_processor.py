@@ -1,11 +1,12 @@
 import os
 import json
 import logging
-from urllib.parse import urlparse, parse_qs
 import requests
 from datetime import datetime
 import re
 
+from .url_classifier import UrlClassifier
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,9 +27,9 @@ class VideoProcessor:
             dict: Validation result with success status and message
         """
         try:
-            parsed_url = urlparse(url)
+            classified = UrlClassifier.classify(url)
             
-            if not parsed_url.scheme in ['http', 'https']:
+            if not classified.scheme in ['http', 'https']:
                 return {'success': False, 'error': 'Invalid URL scheme. URL must start with http:// or https://'}
             
             if platform == 'youtube':
@@ -45,98 +46,38 @@ class VideoProcessor:
     @staticmethod
     def _validate_youtube_url(url):
         """Validate YouTube URL patterns"""
-        # More comprehensive YouTube URL patterns
-        youtube_patterns = [
-            # Standard YouTube watch URLs
-            r'^(https?://)?(www\.)?youtube\.com/watch\?v=[a-zA-Z0-9_-]{11}',
-            # YouTube with additional parameters
-            r'^(https?://)?(www\.)?youtube\.com/watch\?.+&v=[a-zA-Z0-9_-]{11}',
-            # Short youtu.be URLs
-            r'^(https?://)?(www\.)?youtu\.be/[a-zA-Z0-9_-]{11}',
-            # Embed URLs
-            r'^(https?://)?(www\.)?youtube\.com/embed/[a-zA-Z0-9_-]{11}',
-            # Mobile URLs
-            r'^(https?://)?m\.youtube\.com/watch\?v=[a-zA-Z0-9_-]{11}',
-            # YouTube Shorts
-            r'^(https?://)?(www\.)?youtube\.com/shorts/[a-zA-Z0-9_-]{11}',
-            # YouTube live streams
-            r'^(https?://)?(www\.)?youtube\.com/live/[a-zA-Z0-9_-]{11}',
-        ]
-        
-        for pattern in youtube_patterns:
-            if re.search(pattern, url, re.IGNORECASE):
-                video_id = VideoProcessor._extract_youtube_id(url)
-                if video_id and len(video_id) == 11:
-                    return {
-                        'success': True, 
-                        'video_id': video_id,
-                        'message': 'Valid YouTube URL'
-                    }
+        classified = UrlClassifier.classify(url)
+        
+        # watch?v=, youtu.be, embed, shorts and live URLs all carry the video ID
+        if classified.platform == 'youtube' and classified.canonical_id:
+            return {
+                'success': True, 
+                'video_id': classified.canonical_id,
+                'message': 'Valid YouTube URL'
+            }
         
         return {'success': False, 'error': 'Invalid YouTube URL. Please use a standard YouTube video URL.'}
     
     @staticmethod
     def _validate_instagram_url(url):
         """Validate Instagram URL patterns"""
-        instagram_patterns = [
-            r'^(https?://)?(www\.)?instagram\.com/p/[a-zA-Z0-9_-]+',
-            r'^(https?://)?(www\.)?instagram\.com/reel/[a-zA-Z0-9_-]+',
-            r'^(https?://)?(www\.)?instagram\.com/tv/[a-zA-Z0-9_-]+',
-            r'^(https?://)?(www\.)?instagram\.com/stories/[a-zA-Z0-9_-]+',
-            # Instagram with query parameters
-            r'^(https?://)?(www\.)?instagram\.com/p/[a-zA-Z0-9_-]+/?\?',
-            r'^(https?://)?(www\.)?instagram\.com/reel/[a-zA-Z0-9_-]+/?\?',
-        ]
-        
-        for pattern in instagram_patterns:
-            if re.search(pattern, url, re.IGNORECASE):
-                return {
-                    'success': True,
-                    'message': 'Valid Instagram URL'
-                }
+        classified = UrlClassifier.classify(url)
+        
+        # Posts, reels, IGTV and stories
+        if classified.platform == 'instagram' and classified.canonical_id:
+            return {
+                'success': True,
+                'message': 'Valid Instagram URL'
+            }
         
         return {'success': False, 'error': 'Invalid Instagram URL. Please use a standard Instagram post, reel, or story URL.'}
     
     @staticmethod
     def _extract_youtube_id(url):
-        """Extract YouTube video ID from URL using multiple methods"""
-        try:
-            # Method 1: Standard v= parameter
-            standard_match = re.search(r'(?:v=|\/)([0-9A-Za-z_-]{11})', url)
-            if standard_match:
-                return standard_match.group(1)
-            
-            # Method 2: youtu.be short URLs
-            short_match = re.search(r'youtu\.be\/([0-9A-Za-z_-]{11})', url)
-            if short_match:
-                return short_match.group(1)
-            
-            # Method 3: Embed URLs
-            embed_match = re.search(r'embed\/([0-9A-Za-z_-]{11})', url)
-            if embed_match:
-                return embed_match.group(1)
-            
-            # Method 4: YouTube Shorts
-            shorts_match = re.search(r'shorts\/([0-9A-Za-z_-]{11})', url)
-            if shorts_match:
-                return shorts_match.group(1)
-            
-            # Method 5: Live streams
-            live_match = re.search(r'live\/([0-9A-Za-z_-]{11})', url)
-            if live_match:
-                return live_match.group(1)
-            
-            # Method 6: Parse query parameters
-            parsed_url = urlparse(url)
-            query_params = parse_qs(parsed_url.query)
-            if 'v' in query_params:
-                video_id = query_params['v'][0]
-                if len(video_id) == 11:
-                    return video_id
-                    
-        except Exception as e:
-            logger.error(f"Error extracting YouTube ID: {e}")
-            
+        """Extract YouTube video ID from URL"""
+        classified = UrlClassifier.classify(url)
+        if classified.platform == 'youtube':
+            return classified.canonical_id
         return None
     
     @staticmethod
@@ -166,7 +107,8 @@ class VideoProcessor:
     def _extract_youtube_metadata(url):
         """Extract YouTube-specific metadata"""
         metadata = {}
-        video_id = VideoProcessor._extract_youtube_id(url)
+        classified = UrlClassifier.classify(url)
+        video_id = classified.canonical_id if classified.platform == 'youtube' else None
         
         if video_id:
             metadata.update({
@@ -176,21 +118,14 @@ class VideoProcessor:
                 'thumbnail_url_sd': f'https://img.youtube.com/vi/{video_id}/sddefault.jpg',
                 'thumbnail_url_mq': f'https://img.youtube.com/vi/{video_id}/mqdefault.jpg',
                 'thumbnail_url_hq': f'https://img.youtube.com/vi/{video_id}/hqdefault.jpg',
-                'webpage_url': f'https://www.youtube.com/watch?v={video_id}'
+                'webpage_url': classified.canonical_url
             })
         
-        # Extract timestamp from URL if present
-        parsed_url = urlparse(url)
-        query_params = parse_qs(parsed_url.query)
-        
-        if 't' in query_params:
-            metadata['start_time'] = query_params['t'][0]
-        elif 'start' in query_params:
-            metadata['start_time'] = query_params['start'][0]
-        
-        # Extract other parameters
-        if 'list' in query_params:
-            metadata['playlist_id'] = query_params['list'][0]
+        # Timestamp (t= or start=) and playlist come from the same parse
+        if classified.start_time:
+            metadata['start_time'] = classified.start_time
+        if classified.playlist_id:
+            metadata['playlist_id'] = classified.playlist_id
             
         return metadata
     
@@ -225,6 +160,24 @@ class VideoProcessor:
             
         return metadata
     
+    @staticmethod
+    def get_canonical_key(url, platform=None):
+        """
+        Build a key that is the same for every URL form of one video
+        
+        Args:
+            url (str): Video URL
+            platform (str): Platform name, detected from the URL if omitted
+            
+        Returns:
+            str: Key such as 'youtube:dQw4w9WgXcQ', or None if no ID was found
+        """
+        classified = UrlClassifier.classify(url)
+        
+        if not classified.canonical_id or (platform and platform != classified.platform):
+            return None
+        return f'{classified.platform}:{classified.canonical_id}'
+    
     @staticmethod
     def get_available_formats(url, platform):
         """
@@ -334,7 +287,10 @@ class VideoProcessor:
                 {'value': 'best', 'label': 'Best Quality (320kbps)'},
                 {'value': '192k', 'label': 'High Quality (192kbps)'},
                 {'value': '128k', 'label': 'Good Quality (128kbps)'},
-                {'value': '64k', 'label': 'Standard Quality (64kbps)'}
+                {'value': '64k', 'label': 'Standard Quality (64kbps)'},
+                # Source stream remuxed without re-encoding
+                {'value': 'm4a', 'label': 'Original AAC (m4a, no re-encoding)'},
+                {'value': 'opus', 'label': 'Original Opus (ogg, no re-encoding)'}
             ]
         else:
             # Video quality options
@@ -739,17 +695,7 @@ class VideoProcessor:
         Returns:
             str: Detected platform ('youtube', 'instagram', or 'unknown')
         """
-        if not url:
-            return 'unknown'
-            
-        url_lower = url.lower()
-        
-        if any(domain in url_lower for domain in ['youtube.com', 'youtu.be']):
-            return 'youtube'
-        elif 'instagram.com' in url_lower:
-            return 'instagram'
-        else:
-            return 'unknown'
+        return UrlClassifier.classify(url).platform
     
     @staticmethod
     def format_quality_label(format_info):
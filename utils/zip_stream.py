@@ -0,0 +1,77 @@
+import io
+import logging
+import os
+import time
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file object that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+class ZipStream:
+    """Builds a ZIP archive on the fly without touching the disk"""
+
+    @staticmethod
+    def generate(files, chunk_size=CHUNK_SIZE):
+        """
+        Yield a ZIP of the given files, one chunk at a time
+
+        Entries are stored rather than deflated, since audio and video are
+        already compressed. The sink cannot seek, so zipfile writes each
+        entry's CRC and sizes in a data descriptor after its data. Memory
+        use stays at about one chunk however large the files are.
+
+        Args:
+            files (list): (filepath, arcname) tuples
+            chunk_size (int): Bytes read from each file at a time
+
+        Yields:
+            bytes: The next piece of the archive
+        """
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for filepath, arcname in files:
+                try:
+                    source = open(filepath, 'rb')
+                except OSError as e:
+                    logger.warning(f"Skipping {arcname} in archive: {e}")
+                    continue
+
+                with source:
+                    stat = os.fstat(source.fileno())
+                    info = zipfile.ZipInfo(arcname, date_time=time.localtime(stat.st_mtime)[:6])
+                    info.compress_type = zipfile.ZIP_STORED
+                    info.file_size = stat.st_size
+                    # zipfile switches the entry to ZIP64 from file_size when it is needed
+                    with archive.open(info, 'w') as entry:
+                        while True:
+                            chunk = source.read(chunk_size)
+                            if not chunk:
+                                break
+                            entry.write(chunk)
+                            data = sink.drain()
+                            if data:
+                                yield data
+                data = sink.drain()
+                if data:
+                    yield data
+        # Central directory, written when the archive closes
+        yield sink.drain()